@@ -16,6 +16,7 @@ LOG_DIR = os.path.join(ROOT_DIR, "logs")       # Shared log directory
 
 # Database
 DB_FILE = os.path.join(DB_DIR, "phi_mapping.db")
+DB_COMMIT_FILES = 50  # Serial runs commit new mappings once per this many files
 
 # Processing defaults
 DEFAULT_MODE = "all"  # No params = process everything
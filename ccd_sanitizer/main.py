@@ -6,10 +6,12 @@ Sanitizes HL7 v3 CDA/CCD XML documents to remove PHI while maintaining context
 import os
 import sys
 import argparse
+import heapq
 import logging
+import multiprocessing
 import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
-from pathlib import Path
 from typing import List, Dict
 
 # Add src to path
@@ -18,6 +20,16 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
 import config
 from src.sanitizer import CCDSanitizer
 from src.database import PHIDatabase
+from src import phi_generator
+
+# Extension filter as a tuple so str.endswith checks them in one call
+_SUPPORTED_EXTENSIONS = tuple(config.SUPPORTED_EXTENSIONS)
+
+# All CCD output goes to CCD/ANON_<stem>.xml
+_OUTPUT_PREFIX = os.path.join("CCD", "ANON_")
+
+# Per-process sanitizer used by pool workers (set by _init_worker)
+_worker_sanitizer = None
 
 
 def setup_logging(log_level: str = config.LOG_LEVEL):
@@ -52,6 +64,38 @@ def setup_logging(log_level: str = config.LOG_LEVEL):
     return logging.getLogger(__name__)
 
 
+def _walk(directory: str, extensions: tuple):
+    """
+    Yield supported input files under directory in a single scandir pass
+
+    Skips hidden files/directories and already anonymized (ANON_) files.
+    """
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            name = entry.name
+            if name.startswith('.'):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk(entry.path, extensions)
+            elif name.endswith(extensions) and not name.startswith('ANON_') and entry.is_file():
+                yield entry.path
+
+
+def reservoir_sample(iterable, k: int) -> List:
+    """Uniformly sample up to k items from an iterable in a single pass"""
+    sample = []
+    for i, item in enumerate(iterable):
+        if i < k:
+            sample.append(item)
+        else:
+            j = int(random.random() * (i + 1))
+            if j < k:
+                sample[j] = item
+    # Reservoir slots are position-biased; shuffle to match random.sample order.
+    random.shuffle(sample)
+    return sample
+
+
 def get_input_files(input_dir: str, count: int = None, random_select: bool = False,
                    specific_files: List[str] = None) -> List[str]:
     """
@@ -69,36 +113,26 @@ def get_input_files(input_dir: str, count: int = None, random_select: bool = Fal
     if specific_files:
         return [os.path.join(input_dir, f) for f in specific_files]
 
-    # Get all supported files - RECURSIVELY search subdirectories
-    all_files = []
-    for ext in config.SUPPORTED_EXTENSIONS:
-        pattern = f"**/*{ext}"  # ** means recursive search
-        all_files.extend(Path(input_dir).rglob(f"*{ext}"))
-
-    # Convert to strings and filter out hidden files/directories
-    all_files = [str(f) for f in all_files if not any(part.startswith('.') for part in Path(f).parts)]
-
-    # Filter out already anonymized files (starting with ANON_)
-    all_files = [f for f in all_files if not os.path.basename(f).startswith('ANON_')]
-
-    if not all_files:
+    if not os.path.isdir(input_dir):
         return []
 
+    # Get all supported files - RECURSIVELY search subdirectories
+    files = _walk(input_dir, _SUPPORTED_EXTENSIONS)
+
     # Select files
     if count is None:
         # Process all
-        return all_files
+        return list(files)
 
     if random_select:
-        # Random selection
-        return random.sample(all_files, min(count, len(all_files)))
+        # Random selection without materializing the whole tree
+        return reservoir_sample(files, count)
     else:
         # First N files (alphabetically)
-        all_files.sort()
-        return all_files[:count]
+        return heapq.nsmallest(count, files)
 
 
-def generate_output_filename(input_path: str, document_type: str, input_dir: str) -> str:
+def generate_output_filename(input_path: str) -> str:
     """
     Generate output filename with ANON_ prefix
     Forces output to CCD subdirectory for organization
@@ -106,89 +140,185 @@ def generate_output_filename(input_path: str, document_type: str, input_dir: str
     """
     # Build standardized XML output filename regardless of input extension.
     filename = os.path.basename(input_path)
-    stem, _ = os.path.splitext(filename)
-    output_filename = f"ANON_{stem}.xml"
+    stem = filename.rpartition('.')[0] or filename
+    return f"{_OUTPUT_PREFIX}{stem}.xml"
+
 
-    # Force output to CCD subdirectory
-    return os.path.join("CCD", output_filename)
+def sanitize_one(sanitizer: CCDSanitizer, input_path: str) -> Dict:
+    """
+    Sanitize a single input file and return its manifest entry
+
+    Failures are logged and reported in the entry instead of raised, so one bad
+    file never aborts the run.
+    """
+    logger = logging.getLogger(__name__)
+
+    try:
+        # Output name does not depend on the parsed document, so resolve it
+        # up front and let the sanitizer write straight to its final path.
+        output_filename = generate_output_filename(input_path)
+        output_path = os.path.join(config.OUTPUT_DIR, output_filename)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+        result = sanitizer.sanitize_file(input_path, output_path)
+
+        logger.info(f"✓ Success: {output_filename}")
+        return {
+            'input_path': input_path,
+            'output_path': output_path,
+            'output_filename': output_filename,
+            'message_type': result['message_type'],
+            'phi_count': result['phi_count'],
+            'status': 'success'
+        }
+
+    except Exception as e:
+        logger.error(f"✗ Failed: {str(e)}", exc_info=True)
+        return {
+            'input_path': input_path,
+            'output_path': '',
+            'output_filename': os.path.basename(input_path),
+            'message_type': 'UNKNOWN',
+            'phi_count': 0,
+            'status': 'failed',
+            'error': str(e)
+        }
+
+
+def _init_worker(db_path: str, log_level: str):
+    """Pool initializer: one sanitizer and DB connection per worker process"""
+    global _worker_sanitizer
+
+    # Spawned workers start without handlers; forked ones inherit the parent's.
+    if not logging.getLogger().handlers:
+        setup_logging(log_level)
+
+    # Forked workers inherit the parent's RNG state and would otherwise all
+    # generate the same fake identities.
+    random.seed()
+    if phi_generator.fake is not None:
+        phi_generator.fake.seed_instance()
+
+    # PHIDatabase opens in WAL mode with a busy timeout, so workers can share it.
+    _worker_sanitizer = CCDSanitizer(db_path)
+
+
+def _sanitize_in_worker(input_path: str) -> Dict:
+    """Pool task wrapper around sanitize_one"""
+    return sanitize_one(_worker_sanitizer, input_path)
 
 
 def write_manifest(run_id: str, files_processed: List[Dict], stats: Dict):
     """Write processing manifest file"""
     manifest_file = os.path.join(config.LOG_DIR, f"run_manifest_{run_id}.txt")
 
-    with open(manifest_file, 'w') as f:
-        f.write("=" * 60 + "\n")
-        f.write("CCD/CDA PHI SANITIZATION RUN\n")
-        f.write("=" * 60 + "\n\n")
-
-        f.write(f"Run ID: {run_id}\n")
-        f.write(f"Mode: {stats['mode']}\n")
-        f.write(f"Root Directory: {config.ROOT_DIR}\n")
-        f.write(f"Started: {stats['start_time']}\n")
-        f.write(f"Completed: {stats['end_time']}\n")
-        f.write(f"Duration: {stats['duration_seconds']} seconds\n\n")
-
-        success_count = sum(1 for f in files_processed if f['status'] == 'success')
-        fail_count = len(files_processed) - success_count
-
-        f.write(f"FILES PROCESSED ({success_count} of {len(files_processed)} succeeded):\n\n")
-
-        for i, file_info in enumerate(files_processed, 1):
-            status_icon = "✓" if file_info['status'] == 'success' else "✗"
-
-            f.write(f"{i}. {status_icon} {file_info['output_filename']}\n")
-            f.write(f"   Original: {os.path.basename(file_info['input_path'])}\n")
-            f.write(f"   Type: {file_info['message_type']}\n")
-            f.write(f"   PHI Replaced: {file_info['phi_count']} elements\n")
+    # Build the whole manifest in memory and write it in one call.
+    parts = []
+    add = parts.append
 
-            if file_info['status'] != 'success':
-                f.write(f"   Error: {file_info.get('error', 'Unknown error')}\n")
+    add("=" * 60 + "\n")
+    add("CCD/CDA PHI SANITIZATION RUN\n")
+    add("=" * 60 + "\n\n")
 
-            f.write("\n")
+    add(f"Run ID: {run_id}\n")
+    add(f"Mode: {stats['mode']}\n")
+    add(f"Root Directory: {config.ROOT_DIR}\n")
+    add(f"Started: {stats['start_time']}\n")
+    add(f"Completed: {stats['end_time']}\n")
+    add(f"Duration: {stats['duration_seconds']} seconds\n\n")
 
-        # Database summary
-        f.write("=" * 60 + "\n")
-        f.write("DATABASE SUMMARY\n")
-        f.write("=" * 60 + "\n")
-
-        db_stats = stats.get('db_stats', {})
-        f.write(f"Total Patients: {db_stats.get('patients', 0)}\n")
-        f.write(f"Total Organizations: {db_stats.get('organizations', 0)}\n")
-        f.write(f"Total Providers: {db_stats.get('providers', 0)}\n\n")
-
-        # QA instructions
-        f.write("=" * 60 + "\n")
-        f.write("QA INSTRUCTIONS\n")
-        f.write("=" * 60 + "\n")
-        f.write("Compare these file pairs to verify PHI removal:\n\n")
-
-        for i, file_info in enumerate(files_processed, 1):
-            if file_info['status'] == 'success':
-                f.write(f"{i}. {os.path.basename(file_info['input_path'])} → ")
-                f.write(f"output/{file_info['output_filename']}\n")
+    success_count = sum(1 for f in files_processed if f['status'] == 'success')
 
-        f.write("\n")
+    add(f"FILES PROCESSED ({success_count} of {len(files_processed)} succeeded):\n\n")
+
+    # QA pairs are collected in the same pass and emitted after the summary.
+    qa_lines = []
+    for i, file_info in enumerate(files_processed, 1):
+        original = os.path.basename(file_info['input_path'])
+
+        if file_info['status'] == 'success':
+            add(f"{i}. ✓ {file_info['output_filename']}\n"
+                f"   Original: {original}\n"
+                f"   Type: {file_info['message_type']}\n"
+                f"   PHI Replaced: {file_info['phi_count']} elements\n\n")
+            qa_lines.append(f"{i}. {original} → output/{file_info['output_filename']}\n")
+        else:
+            add(f"{i}. ✗ {file_info['output_filename']}\n"
+                f"   Original: {original}\n"
+                f"   Type: {file_info['message_type']}\n"
+                f"   PHI Replaced: {file_info['phi_count']} elements\n"
+                f"   Error: {file_info.get('error', 'Unknown error')}\n\n")
+
+    # Database summary
+    add("=" * 60 + "\n")
+    add("DATABASE SUMMARY\n")
+    add("=" * 60 + "\n")
+
+    db_stats = stats.get('db_stats', {})
+    add(f"Total Patients: {db_stats.get('patients', 0)}\n")
+    add(f"Total Organizations: {db_stats.get('organizations', 0)}\n")
+    add(f"Total Providers: {db_stats.get('providers', 0)}\n\n")
+
+    # QA instructions
+    add("=" * 60 + "\n")
+    add("QA INSTRUCTIONS\n")
+    add("=" * 60 + "\n")
+    add("Compare these file pairs to verify PHI removal:\n\n")
+    parts.extend(qa_lines)
+    add("\n")
+
+    with open(manifest_file, 'w', buffering=1 << 20) as f:
+        f.write(''.join(parts))
 
     return manifest_file
 
 
 def cleanup_previous_run(output_subdirs=None):
-    """Delete only selected output subdirectories from previous runs."""
+    """
+    Delete only selected output subdirectories from previous runs
+
+    Each target is renamed to a sidecar (instant, same filesystem) and the
+    sidecars are removed in a background thread so processing can start
+    right away. Returns that thread (or None) for the caller to join.
+    """
     import shutil
+    import threading
 
     if output_subdirs is None:
         output_subdirs = []
 
+    stale_dirs = []
     # Delete only targeted output subdirectories.
     for subdir in sorted(set(output_subdirs)):
         target = os.path.join(config.OUTPUT_DIR, subdir)
+
+        # Sidecars left behind by an interrupted run
+        prefix = f"{subdir}.stale."
+        if os.path.isdir(config.OUTPUT_DIR):
+            stale_dirs.extend(
+                os.path.join(config.OUTPUT_DIR, name)
+                for name in os.listdir(config.OUTPUT_DIR) if name.startswith(prefix)
+            )
+
         if os.path.exists(target):
             print(f"Cleaning up previous output subdirectory: {target}")
-            shutil.rmtree(target)
+            stale = f"{target}.stale.{os.getpid()}"
+            os.rename(target, stale)
+            stale_dirs.append(stale)
 
     print()
 
+    if not stale_dirs:
+        return None
+
+    def _remove_stale():
+        for stale in stale_dirs:
+            shutil.rmtree(stale, ignore_errors=True)
+
+    thread = threading.Thread(target=_remove_stale, name='cleanup-previous-run', daemon=True)
+    thread.start()
+    return thread
+
 
 def main():
     """Main entry point"""
@@ -214,6 +344,10 @@ def main():
     parser.add_argument('--clean-db', action='store_true',
                        help='Delete database before starting (fresh mappings)')
 
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Number of worker processes (default: 1 = serial; run-wide '
+                            'caches such as clinician fake names are per worker)')
+
     args = parser.parse_args()
 
     # Clean database if requested
@@ -268,62 +402,59 @@ def main():
         return 0
 
     # Clean up previous run output for CCD only.
-    cleanup_previous_run(output_subdirs=["CCD"])
+    cleanup_thread = cleanup_previous_run(output_subdirs=["CCD"])
 
     # Create output directory
     os.makedirs(config.OUTPUT_DIR, exist_ok=True)
     os.makedirs(config.DB_DIR, exist_ok=True)
 
-    # Initialize sanitizer
-    sanitizer = CCDSanitizer(config.DB_FILE)
-
-    # Process files
-    files_processed = []
-
-    for i, input_path in enumerate(input_files, 1):
-        logger.info(f"\n[{i}/{len(input_files)}] Processing: {os.path.basename(input_path)}")
-
-        try:
-            result = sanitizer.sanitize_file(input_path, "temp_output.xml")
-
-            # Generate proper output filename (preserves subdirectory structure)
-            output_filename = generate_output_filename(input_path, result['message_type'], config.INPUT_DIR)
-            output_path = os.path.join(config.OUTPUT_DIR, output_filename)
+    workers = max(1, min(args.workers, len(input_files)))
+    total = len(input_files)
 
-            # Create subdirectories in output if needed
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    if workers == 1:
+        # Initialize sanitizer
+        sanitizer = CCDSanitizer(config.DB_FILE)
 
-            # Move temp file to proper location
-            os.rename("temp_output.xml", output_path)
+        # Process files. Single writer: commit new mappings once per
+        # config.DB_COMMIT_FILES files instead of once per file.
+        files_processed = []
+        step = max(1, config.DB_COMMIT_FILES)
+        for start in range(0, total, step):
+            with sanitizer.db.batch():
+                for i, input_path in enumerate(input_files[start:start + step], start + 1):
+                    logger.info(f"\n[{i}/{total}] Processing: {os.path.basename(input_path)}")
+                    files_processed.append(sanitize_one(sanitizer, input_path))
 
-            files_processed.append({
-                'input_path': input_path,
-                'output_path': output_path,
-                'output_filename': output_filename,
-                'message_type': result['message_type'],
-                'phi_count': result['phi_count'],
-                'status': 'success'
-            })
+        # Get database stats
+        db_stats = sanitizer.db.get_stats()
 
-            logger.info(f"✓ Success: {output_filename}")
-
-        except Exception as e:
-            logger.error(f"✗ Failed: {str(e)}", exc_info=True)
-            files_processed.append({
-                'input_path': input_path,
-                'output_path': '',
-                'output_filename': os.path.basename(input_path),
-                'message_type': 'UNKNOWN',
-                'phi_count': 0,
-                'status': 'failed',
-                'error': str(e)
-            })
-
-    # Get database stats
-    db_stats = sanitizer.db.get_stats()
-
-    # Close sanitizer
-    sanitizer.close()
+        # Close sanitizer
+        sanitizer.close()
+    else:
+        logger.info(f"Workers: {workers}")
+
+        # Create the schema once here so workers never race on CREATE TABLE.
+        db = PHIDatabase(config.DB_FILE)
+
+        # Keep manifest entries in input order regardless of completion order.
+        files_processed = [None] * total
+        # Spawn rather than fork: the cleanup thread and the schema connection
+        # above must not be copied mid-flight into the workers.
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker,
+                                 initargs=(config.DB_FILE, log_level)) as executor:
+            futures = {
+                executor.submit(_sanitize_in_worker, input_path): i
+                for i, input_path in enumerate(input_files)
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                files_processed[i] = future.result()
+                logger.info(f"[{done}/{total}] Finished: {os.path.basename(input_files[i])}")
+
+        db_stats = db.get_stats()
+        db.close()
 
     end_time = datetime.now()
     duration = (end_time - start_time).total_seconds()
@@ -339,6 +470,10 @@ def main():
 
     manifest_file = write_manifest(run_id, files_processed, stats)
 
+    # Let the previous output finish deleting before exiting
+    if cleanup_thread is not None:
+        cleanup_thread.join()
+
     # Summary
     success_count = sum(1 for f in files_processed if f['status'] == 'success')
     fail_count = len(files_processed) - success_count
@@ -2,19 +2,130 @@
 CDA/CCD XML Parser
 Handles HL7 v3 Clinical Document Architecture (CDA) XML documents
 """
-import xml.etree.ElementTree as ET
 import logging
-from typing import Dict, List, Optional
+import sys
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
 from dataclasses import dataclass
 
+from lxml import etree
+
 logger = logging.getLogger(__name__)
 
 
 # CDA namespace
 NS = {'hl7': 'urn:hl7-org:v3'}
+# Hashable form of NS for the compiled-XPath cache, built once
+_NS_ITEMS = tuple(sorted(NS.items()))
+
+# Options shared by both parsers. Comments and processing instructions are
+# dropped (CCDParser.write would otherwise serialize free text nobody sanitized), and
+# entities/network access are pinned off rather than left to lxml defaults.
+_PARSER_OPTIONS = dict(collect_ids=False, huge_tree=False, remove_comments=True,
+                       remove_pis=True, resolve_entities=False, no_network=True)
+
+# Shared parser: content is decoded to str by callers, so the declared
+# document encoding is overridden; the ID index is never queried.
+_PARSER = etree.XMLParser(encoding='utf-8', **_PARSER_OPTIONS)
+
+# Declaration written ahead of serialized output
+_XML_DECLARATION = b'<?xml version="1.0" encoding="UTF-8"?>\n'
+
+# File parser: libxml2 reads the bytes itself and honours the declared encoding.
+_FILE_PARSER = etree.XMLParser(**_PARSER_OPTIONS)
+
+
+def _xpath(expr: str) -> etree.XPath:
+    """Compile an XPath expression against the CDA namespace map."""
+    return etree.XPath(expr, namespaces=NS)
+
+
+# Precompiled XPath expressions (compiled once at import, not per document)
+_XP_GUARDIAN_NAME = _xpath('hl7:guardianPerson/hl7:name')
+
+
+def hl7_tag(local_name: str) -> str:
+    """Build an interned Clark-notation ({namespace}local) CDA tag."""
+    return sys.intern('{urn:hl7-org:v3}' + local_name)
+
+
+# Namespace-qualified tags, expanded once so lookups never resolve the hl7: prefix
+TAG_RECORD_TARGET = hl7_tag('recordTarget')
+TAG_PATIENT = hl7_tag('patient')
+TAG_GUARDIAN = hl7_tag('guardian')
+TAG_AUTHOR = hl7_tag('author')
+TAG_ASSIGNED_AUTHOR = hl7_tag('assignedAuthor')
+TAG_ASSIGNED_PERSON = hl7_tag('assignedPerson')
+TAG_REPRESENTED_ORG = hl7_tag('representedOrganization')
+TAG_ID = hl7_tag('id')
+TAG_NAME = hl7_tag('name')
+TAG_ADDR = hl7_tag('addr')
+TAG_TELECOM = hl7_tag('telecom')
+TAG_BIRTH_TIME = hl7_tag('birthTime')
+TAG_GENDER_CODE = hl7_tag('administrativeGenderCode')
+TAG_GIVEN = hl7_tag('given')
+TAG_FAMILY = hl7_tag('family')
+TAG_STREET = hl7_tag('streetAddressLine')
+TAG_CITY = hl7_tag('city')
+TAG_STATE = hl7_tag('state')
+TAG_POSTAL_CODE = hl7_tag('postalCode')
+TAG_TEMPLATE_ID = hl7_tag('templateId')
+
+# Tags that fill a patient or provider slot during the extraction walk
+_AUTHOR_SLOT_TAGS = frozenset((TAG_ID, TAG_ADDR, TAG_TELECOM))
+_PHI_LEAF_TAGS = _AUTHOR_SLOT_TAGS | {TAG_NAME, TAG_BIRTH_TIME, TAG_GENDER_CODE}
+
+# Patient address parts, read in a single pass over <addr> children
+_ADDRESS_TAGS = (TAG_STREET, TAG_CITY, TAG_STATE, TAG_POSTAL_CODE)
+
+# Telecom URL schemes: (prefix, prefix length, field the stripped value fills)
+_TELECOM_PREFIXES = (('tel:', 4, 'phone'), ('mailto:', 7, 'email'))
+
+
+@lru_cache(maxsize=256)
+def _compile_xpath(xpath: str, ns_items: Tuple[Tuple[str, str], ...]) -> etree.XPath:
+    """Compile a caller-supplied XPath once per (expression, namespace map) pair."""
+    return etree.XPath(xpath, namespaces=dict(ns_items))
+
 
+def _ns_items(namespace: dict) -> Tuple[Tuple[str, str], ...]:
+    """Return the cache key for a namespace map, skipping the sort for the default NS."""
+    return _NS_ITEMS if namespace is NS else tuple(sorted(namespace.items()))
 
-@dataclass
+
+def _first(xpath: etree.XPath, node):
+    """Return the first node matched by a compiled XPath, or None."""
+    matches = xpath(node)
+    return matches[0] if matches else None
+
+
+def _child(node, tag: str):
+    """Return the first direct child with the given Clark tag, or None."""
+    return next(node.iterchildren(tag), None)
+
+
+def _children_by_tag(node, tags: Tuple[str, ...]) -> Dict:
+    """Map each of the given Clark tags to its first direct child, in one pass."""
+    found = {}
+    for child in node.iterchildren(*tags):
+        found.setdefault(child.tag, child)
+    return found
+
+
+def _telecom_field(telecom) -> Tuple[str, str]:
+    """Classify a telecom element as ('phone'|'email', value without scheme), or ('', value)."""
+    value = telecom.get('value', '')
+    for prefix, length, field in _TELECOM_PREFIXES:
+        if value.startswith(prefix):
+            return field, value[length:]
+    return '', value
+
+
+# Slotted entities drop the per-instance __dict__; slots=True needs Python 3.10+.
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class CCDPatient:
     """Patient information from CCD"""
     mrn: str = ""
@@ -31,7 +142,7 @@ class CCDPatient:
     email: str = ""
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class CCDProvider:
     """Provider/Author information from CCD"""
     id: str = ""
@@ -42,7 +153,7 @@ class CCDProvider:
     phone: str = ""
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class CCDOrganization:
     """Organization/Facility information from CCD"""
     id: str = ""
@@ -51,6 +162,15 @@ class CCDOrganization:
     phone: str = ""
 
 
+@dataclass(**_DATACLASS_OPTIONS)
+class CCDGuardian:
+    """Guardian/Parent information from CCD"""
+    first_name: str = ""
+    last_name: str = ""
+    address: str = ""
+    phone: str = ""
+
+
 class CCDParser:
     """Parse HL7 v3 CDA/CCD XML documents"""
 
@@ -60,25 +180,49 @@ class CCDParser:
         self.document_type = None
         self._parse()
 
+    @classmethod
+    def from_path(cls, path: str) -> 'CCDParser':
+        """
+        Parse a CCD file directly from disk
+
+        Avoids holding the raw file text alongside the tree. Files that are
+        not valid in their declared encoding fall back to the lenient
+        text path (undecodable bytes dropped), as before.
+        """
+        try:
+            root = etree.parse(path, parser=_FILE_PARSER).getroot()
+        except (etree.XMLSyntaxError, OSError) as e:
+            # lxml reports undecodable bytes in a file as OSError
+            logger.debug(f"Direct parse failed ({e}); retrying as decoded text")
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                return cls(f.read())
+
+        inst = cls.__new__(cls)
+        inst.xml_content = None
+        inst.root = root
+        inst.document_type = None
+        logger.debug("Successfully parsed CCD XML")
+        inst._detect_document_type()
+        return inst
+
     def _parse(self):
         """Parse XML content"""
         try:
-            self.root = ET.fromstring(self.xml_content)
+            self.root = etree.fromstring(self.xml_content.encode('utf-8'), parser=_PARSER)
             logger.debug("Successfully parsed CCD XML")
 
             # Detect document type
             self._detect_document_type()
 
-        except ET.ParseError as e:
+        except etree.XMLSyntaxError as e:
             logger.error(f"Failed to parse XML: {e}")
             raise
 
     def _detect_document_type(self):
         """Detect CDA document type from templateId"""
         # Look for CCD templateId: 2.16.840.1.113883.10.20.1
-        template_ids = self.root.findall('.//hl7:templateId', NS)
-
-        for tid in template_ids:
+        # Lazy iteration: stops at the first CCD templateId
+        for tid in self.root.iterdescendants(TAG_TEMPLATE_ID):
             root_attr = tid.get('root', '')
             if '2.16.840.1.113883.10.20.1' in root_attr:
                 self.document_type = 'CCD'
@@ -97,31 +241,88 @@ class CCDParser:
         """
         Extract all PHI from the CCD document
         Returns structured PHI data
+
+        The tree is walked once; each element is dispatched on its tag into
+        the builder for the entity (patient, guardian, provider, organization)
+        it belongs to, instead of running separate descendant searches per
+        entity type.
         """
+        record_target = None        # first recordTarget only
+        in_record_target = False
+        patient_slots = {}
+        patient_telecoms = []
+        guardians = []
+        organizations = []
+        author_slots = []           # one slot dict per author, in document order
+        open_authors = []           # authors whose subtree is currently being walked
+
+        for event, elem in etree.iterwalk(self.root, events=('start', 'end')):
+            tag = elem.tag
+
+            if event == 'end':
+                if tag == TAG_AUTHOR:
+                    open_authors.pop()
+                elif elem is record_target:
+                    in_record_target = False
+                continue
+
+            if tag == TAG_RECORD_TARGET and record_target is None:
+                record_target = elem
+                in_record_target = True
+            elif tag == TAG_GUARDIAN:
+                guardian = self._build_guardian(elem)
+                if guardian is not None:
+                    guardians.append(guardian)
+            elif tag == TAG_REPRESENTED_ORG:
+                org = self._build_organization(elem)
+                if org.name or org.id:
+                    organizations.append(org)
+            elif tag == TAG_AUTHOR:
+                slots = {}
+                author_slots.append(slots)
+                open_authors.append(slots)
+
+            if tag not in _PHI_LEAF_TAGS:
+                continue
+            parent_tag = elem.getparent().tag
+
+            if in_record_target:
+                if tag == TAG_ID:
+                    patient_slots.setdefault('id', elem)
+                elif tag == TAG_ADDR:
+                    patient_slots.setdefault('addr', elem)
+                elif tag == TAG_TELECOM:
+                    patient_telecoms.append(elem)
+                elif parent_tag == TAG_PATIENT:
+                    patient_slots.setdefault(tag, elem)
+
+            if open_authors:
+                if tag == TAG_NAME:
+                    parent = elem.getparent()
+                    grandparent = parent.getparent()
+                    if (parent_tag != TAG_ASSIGNED_PERSON or grandparent is None
+                            or grandparent.tag != TAG_ASSIGNED_AUTHOR):
+                        continue
+                elif parent_tag != TAG_ASSIGNED_AUTHOR or tag not in _AUTHOR_SLOT_TAGS:
+                    continue
+                # First match in document order wins, as with find('.//...')
+                for slots in open_authors:
+                    slots.setdefault(tag, elem)
+
+        # Extract patient data (an empty recordTarget still yields a patient)
+        if record_target is None:
+            logger.warning("No recordTarget found in CCD")
+            patients = []
+        else:
+            patients = [self._build_patient(patient_slots, patient_telecoms)]
+
         phi_data = {
-            'patients': [],
-            'providers': [],
-            'organizations': [],
-            'guardians': []
+            'patients': patients,
+            'providers': list(self._iter_providers(author_slots)),
+            'organizations': organizations,
+            'guardians': guardians
         }
 
-        # Extract patient data
-        patient = self._extract_patient()
-        if patient:
-            phi_data['patients'].append(patient)
-
-        # Extract guardians/contacts
-        guardians = self._extract_guardians()
-        phi_data['guardians'].extend(guardians)
-
-        # Extract providers/authors
-        providers = self._extract_providers()
-        phi_data['providers'].extend(providers)
-
-        # Extract organizations
-        orgs = self._extract_organizations()
-        phi_data['organizations'].extend(orgs)
-
         logger.info(f"Extracted PHI: {len(phi_data['patients'])} patients, "
                    f"{len(phi_data['providers'])} providers, "
                    f"{len(phi_data['organizations'])} organizations, "
@@ -129,26 +330,20 @@ class CCDParser:
 
         return phi_data
 
-    def _extract_patient(self) -> Optional[CCDPatient]:
-        """Extract patient information from recordTarget"""
+    def _build_patient(self, slots: Dict, telecom_elems: List) -> CCDPatient:
+        """Build patient information from elements collected under recordTarget"""
         patient_data = CCDPatient()
 
-        # Find recordTarget section
-        record_target = self.root.find('.//hl7:recordTarget', NS)
-        if not record_target:
-            logger.warning("No recordTarget found in CCD")
-            return None
-
         # Patient ID (MRN)
-        id_elem = record_target.find('.//hl7:id', NS)
+        id_elem = slots.get('id')
         if id_elem is not None:
             patient_data.mrn = id_elem.get('extension', '')
 
         # Patient Name
-        name_elem = record_target.find('.//hl7:patient/hl7:name', NS)
+        name_elem = slots.get(TAG_NAME)
         if name_elem is not None:
-            given = name_elem.find('hl7:given', NS)
-            family = name_elem.find('hl7:family', NS)
+            given = _child(name_elem, TAG_GIVEN)
+            family = _child(name_elem, TAG_FAMILY)
 
             if given is not None and given.text:
                 patient_data.first_name = given.text
@@ -156,22 +351,23 @@ class CCDParser:
                 patient_data.last_name = family.text
 
         # Birth date
-        birth_elem = record_target.find('.//hl7:patient/hl7:birthTime', NS)
+        birth_elem = slots.get(TAG_BIRTH_TIME)
         if birth_elem is not None:
             patient_data.dob = birth_elem.get('value', '')
 
         # Gender
-        gender_elem = record_target.find('.//hl7:patient/hl7:administrativeGenderCode', NS)
+        gender_elem = slots.get(TAG_GENDER_CODE)
         if gender_elem is not None:
             patient_data.gender = gender_elem.get('code', '')
 
         # Address
-        addr_elem = record_target.find('.//hl7:addr', NS)
+        addr_elem = slots.get('addr')
         if addr_elem is not None:
-            street_elem = addr_elem.find('hl7:streetAddressLine', NS)
-            city_elem = addr_elem.find('hl7:city', NS)
-            state_elem = addr_elem.find('hl7:state', NS)
-            zip_elem = addr_elem.find('hl7:postalCode', NS)
+            parts = _children_by_tag(addr_elem, _ADDRESS_TAGS)
+            street_elem = parts.get(TAG_STREET)
+            city_elem = parts.get(TAG_CITY)
+            state_elem = parts.get(TAG_STATE)
+            zip_elem = parts.get(TAG_POSTAL_CODE)
 
             if street_elem is not None and street_elem.text:
                 patient_data.street = street_elem.text
@@ -183,152 +379,149 @@ class CCDParser:
                 patient_data.zip = zip_elem.text
 
         # Phone/Email
-        telecom_elems = record_target.findall('.//hl7:telecom', NS)
         for telecom in telecom_elems:
-            value = telecom.get('value', '')
-            if value.startswith('tel:'):
-                patient_data.phone = value.replace('tel:', '')
-            elif value.startswith('mailto:'):
-                patient_data.email = value.replace('mailto:', '')
+            field, value = _telecom_field(telecom)
+            if field:
+                setattr(patient_data, field, value)
 
         logger.debug(f"Extracted patient: {patient_data.last_name}, {patient_data.first_name} | MRN: {patient_data.mrn}")
 
         return patient_data
 
-    def _extract_guardians(self) -> List[Dict]:
-        """Extract guardian/parent information"""
-        guardians = []
+    def _build_guardian(self, guardian) -> Optional[CCDGuardian]:
+        """
+        Build guardian/parent information from a guardian element
+        Returns None when the guardian carries no name, address or phone
+        """
+        guardian_data = CCDGuardian()
+        found = False
+
+        # Name
+        name_elem = _first(_XP_GUARDIAN_NAME, guardian)
+        if name_elem is not None:
+            found = True
+            given = _child(name_elem, TAG_GIVEN)
+            family = _child(name_elem, TAG_FAMILY)
 
-        # Find guardian elements
-        guardian_elems = self.root.findall('.//hl7:guardian', NS)
-
-        for guardian in guardian_elems:
-            guardian_data = {}
-
-            # Name
-            name_elem = guardian.find('hl7:guardianPerson/hl7:name', NS)
-            if name_elem is not None:
-                given = name_elem.find('hl7:given', NS)
-                family = name_elem.find('hl7:family', NS)
-
-                guardian_data['first_name'] = given.text if given is not None and given.text else ""
-                guardian_data['last_name'] = family.text if family is not None and family.text else ""
-
-            # Address
-            addr_elem = guardian.find('hl7:addr', NS)
-            if addr_elem is not None:
-                street = addr_elem.find('hl7:streetAddressLine', NS)
-                guardian_data['address'] = street.text if street is not None and street.text else ""
-
-            # Phone
-            telecom = guardian.find('hl7:telecom', NS)
-            if telecom is not None:
-                value = telecom.get('value', '')
-                if value.startswith('tel:'):
-                    guardian_data['phone'] = value.replace('tel:', '')
-
-            if guardian_data:
-                guardians.append(guardian_data)
-
-        return guardians
-
-    def _extract_providers(self) -> List[CCDProvider]:
-        """Extract provider/author information"""
-        providers = []
-
-        # Find all author elements
-        author_elems = self.root.findall('.//hl7:author', NS)
-
-        for author in author_elems:
-            provider = CCDProvider()
-
-            # Provider ID
-            id_elem = author.find('.//hl7:assignedAuthor/hl7:id', NS)
-            if id_elem is not None:
-                provider.id = id_elem.get('extension', '')
-                # Check for NPI
-                if id_elem.get('root', '') == '2.16.840.1.113883.4.6':
-                    provider.npi = id_elem.get('extension', '')
-
-            # Provider Name
-            name_elem = author.find('.//hl7:assignedAuthor/hl7:assignedPerson/hl7:name', NS)
-            if name_elem is not None:
-                given = name_elem.find('hl7:given', NS)
-                family = name_elem.find('hl7:family', NS)
-
-                if given is not None and given.text:
-                    provider.first_name = given.text
-                if family is not None and family.text:
-                    provider.last_name = family.text
-
-            # Address
-            addr_elem = author.find('.//hl7:assignedAuthor/hl7:addr', NS)
-            if addr_elem is not None:
-                street = addr_elem.find('hl7:streetAddressLine', NS)
-                provider.address = street.text if street is not None and street.text else ""
-
-            # Phone
-            telecom = author.find('.//hl7:assignedAuthor/hl7:telecom', NS)
-            if telecom is not None:
-                value = telecom.get('value', '')
-                if value.startswith('tel:'):
-                    provider.phone = value.replace('tel:', '')
+            guardian_data.first_name = given.text if given is not None and given.text else ""
+            guardian_data.last_name = family.text if family is not None and family.text else ""
 
+        # Address
+        addr_elem = _child(guardian, TAG_ADDR)
+        if addr_elem is not None:
+            found = True
+            street = _child(addr_elem, TAG_STREET)
+            guardian_data.address = street.text if street is not None and street.text else ""
+
+        # Phone
+        telecom = _child(guardian, TAG_TELECOM)
+        if telecom is not None:
+            field, value = _telecom_field(telecom)
+            if field == 'phone':
+                found = True
+                guardian_data.phone = value
+
+        return guardian_data if found else None
+
+    def _iter_providers(self, author_slots: List[Dict]) -> Iterator[CCDProvider]:
+        """Yield named providers/authors built from the collected author slots"""
+        for slots in author_slots:
+            provider = self._build_provider(slots)
             if provider.first_name or provider.last_name:
-                providers.append(provider)
+                yield provider
+
+    def _build_provider(self, slots: Dict) -> CCDProvider:
+        """Build provider/author information from elements collected under an author"""
+        provider = CCDProvider()
+
+        # Provider ID
+        id_elem = slots.get(TAG_ID)
+        if id_elem is not None:
+            provider.id = id_elem.get('extension', '')
+            # Check for NPI
+            if id_elem.get('root', '') == '2.16.840.1.113883.4.6':
+                provider.npi = id_elem.get('extension', '')
 
-        return providers
+        # Provider Name
+        name_elem = slots.get(TAG_NAME)
+        if name_elem is not None:
+            given = _child(name_elem, TAG_GIVEN)
+            family = _child(name_elem, TAG_FAMILY)
+
+            if given is not None and given.text:
+                provider.first_name = given.text
+            if family is not None and family.text:
+                provider.last_name = family.text
 
-    def _extract_organizations(self) -> List[CCDOrganization]:
-        """Extract organization/facility information"""
-        orgs = []
+        # Address
+        addr_elem = slots.get(TAG_ADDR)
+        if addr_elem is not None:
+            street = _child(addr_elem, TAG_STREET)
+            provider.address = street.text if street is not None and street.text else ""
 
-        # Find all representedOrganization elements
-        org_elems = self.root.findall('.//hl7:representedOrganization', NS)
+        # Phone
+        telecom = slots.get(TAG_TELECOM)
+        if telecom is not None:
+            field, value = _telecom_field(telecom)
+            if field == 'phone':
+                provider.phone = value
 
-        for org_elem in org_elems:
-            org = CCDOrganization()
+        return provider
 
-            # Organization ID
-            id_elem = org_elem.find('hl7:id', NS)
-            if id_elem is not None:
-                org.id = id_elem.get('extension', '')
+    def _build_organization(self, org_elem) -> CCDOrganization:
+        """Build organization/facility information from a representedOrganization element"""
+        org = CCDOrganization()
 
-            # Organization Name
-            name_elem = org_elem.find('hl7:name', NS)
-            if name_elem is not None and name_elem.text:
-                org.name = name_elem.text
+        # Organization ID
+        id_elem = _child(org_elem, TAG_ID)
+        if id_elem is not None:
+            org.id = id_elem.get('extension', '')
 
-            # Address
-            addr_elem = org_elem.find('hl7:addr', NS)
-            if addr_elem is not None:
-                street = addr_elem.find('hl7:streetAddressLine', NS)
-                org.address = street.text if street is not None and street.text else ""
+        # Organization Name
+        name_elem = _child(org_elem, TAG_NAME)
+        if name_elem is not None and name_elem.text:
+            org.name = name_elem.text
 
-            # Phone
-            telecom = org_elem.find('hl7:telecom', NS)
-            if telecom is not None:
-                value = telecom.get('value', '')
-                if value.startswith('tel:'):
-                    org.phone = value.replace('tel:', '')
+        # Address
+        addr_elem = _child(org_elem, TAG_ADDR)
+        if addr_elem is not None:
+            street = _child(addr_elem, TAG_STREET)
+            org.address = street.text if street is not None and street.text else ""
 
-            if org.name or org.id:
-                orgs.append(org)
+        # Phone
+        telecom = _child(org_elem, TAG_TELECOM)
+        if telecom is not None:
+            field, value = _telecom_field(telecom)
+            if field == 'phone':
+                org.phone = value
 
-        return orgs
+        return org
 
     def replace_element_text(self, xpath: str, new_text: str, namespace: dict = NS):
         """Replace text content of XML element(s)"""
-        elements = self.root.findall(xpath, namespace)
+        elements = _compile_xpath(xpath, _ns_items(namespace))(self.root)
         for elem in elements:
             elem.text = new_text
 
     def replace_element_attribute(self, xpath: str, attr_name: str, new_value: str, namespace: dict = NS):
         """Replace attribute value of XML element(s)"""
-        elements = self.root.findall(xpath, namespace)
+        elements = _compile_xpath(xpath, _ns_items(namespace))(self.root)
         for elem in elements:
             elem.set(attr_name, new_value)
 
     def to_string(self) -> str:
         """Convert XML tree back to string"""
-        return ET.tostring(self.root, encoding='unicode', method='xml')
+        return etree.tostring(self.root, encoding='unicode', method='xml')
+
+    def write(self, path: str):
+        """
+        Write the document to path as UTF-8 with an XML declaration
+
+        Serialized incrementally in C straight into the file, so no full
+        copy of the document is held in memory alongside the tree.
+        Only the root element is written, as with to_string().
+        """
+        with open(path, 'wb') as f:
+            f.write(_XML_DECLARATION)
+            with etree.xmlfile(f, encoding='utf-8') as xf:
+                xf.write(self.root)
@@ -2,28 +2,155 @@
 CCD/CDA PHI Sanitizer
 Sanitizes HL7 v3 CDA/CCD XML documents to remove PHI
 """
+import contextlib
 import logging
 import os
 import re
-import xml.etree.ElementTree as ET
-from typing import Dict, Any, List, Set
-
-from .ccd_parser import CCDParser
+from functools import lru_cache
+from typing import Dict, Any, List, Set, Tuple
+
+from lxml import etree
+
+# RE2 (google-re2) scans in guaranteed linear time; fall back to re if absent
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+from .ccd_parser import (
+    CCDParser, NS, hl7_tag,
+    TAG_RECORD_TARGET, TAG_PATIENT, TAG_REPRESENTED_ORG,
+    TAG_ID, TAG_NAME, TAG_ADDR, TAG_TELECOM,
+    TAG_GIVEN, TAG_FAMILY, TAG_STREET, TAG_CITY, TAG_STATE, TAG_POSTAL_CODE,
+)
 from .phi_generator import PHIGenerator
 from .database import PHIDatabase
 
 logger = logging.getLogger(__name__)
 
 
+# Organization-like elements sanitized as facilities
+ORG_TAG_SUFFIXES = (
+    'representedOrganization',
+    'representedCustodianOrganization',
+    'serviceProviderOrganization',
+    'providerOrganization',
+    'wholeOrganization',
+    'manufacturerOrganization',
+    'scopingOrganization',
+)
+# Elements whose <name> is collected as an org name for narrative scrubbing
+ORG_NAME_TAG_SUFFIXES = ORG_TAG_SUFFIXES + ('playingEntity',)
+
+# Standard date element tags coarsened to year only
+DATE_TAGS = ('birthTime', 'effectiveTime', 'time', 'low', 'high', 'center')
+
+
+# Tags dispatched on during the single sanitization walk
+TAG_VALUE = hl7_tag('value')
+TAG_HEALTH_CARE_FACILITY = hl7_tag('healthCareFacility')
+# Child tags looked up by the per-element handlers
+TAG_PREFIX = hl7_tag('prefix')
+TAG_LOCATION = hl7_tag('location')
+_ORG_TAGS = frozenset(hl7_tag(suffix) for suffix in ORG_TAG_SUFFIXES)
+_DATE_TAGS = frozenset(hl7_tag(tag) for tag in DATE_TAGS)
+_ORG_NAME_TAGS = frozenset(hl7_tag(suffix) for suffix in ORG_NAME_TAG_SUFFIXES)
+_XSI_TYPE = '{http://www.w3.org/2001/XMLSchema-instance}type'
+# recordTarget descendants rewritten by _sanitize_patient
+_RECORD_TARGET_PART_TAGS = (TAG_ID, TAG_NAME, TAG_ADDR, TAG_TELECOM)
+
+# Telecom URL scheme (text before the first ':') -> kind of replacement
+_TELECOM_PHONE, _TELECOM_EMAIL, _TELECOM_WEB = 1, 2, 3
+_TELECOM_KINDS = {
+    'tel': _TELECOM_PHONE,
+    'fax': _TELECOM_PHONE,
+    'mailto': _TELECOM_EMAIL,
+    'http': _TELECOM_WEB,
+    'https': _TELECOM_WEB,
+}
+
+
+def _trie_node_pattern(node: Dict) -> str:
+    """Render one trie node as a regex; longer continuations are tried first."""
+    branches = [re.escape(ch) + _trie_node_pattern(child)
+                for ch, child in node.items() if ch]
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if '' in node:
+        # A word ends here: the rest is optional (greedy, so longest wins)
+        if len(branches) == 1:
+            body = '(?:' + body + ')'
+        body += '?'
+    return body
+
+
+def _literal_trie_pattern(words) -> str:
+    """
+    Build a case-insensitive regex source matching any of the literal words
+
+    Words are merged into a trie keyed on casefolded characters and rendered
+    with shared prefixes factored out, so the regex engine follows one trie
+    path per position instead of retrying every alternative. At each
+    position the longest matching word wins, exactly as with a longest-first
+    alternation. Compile with re.IGNORECASE. Falls back to that plain
+    alternation when casefolding would change a word's length (e.g. 'ß').
+    """
+    ordered = sorted(words, key=len, reverse=True)
+    trie = {}
+    for word in ordered:
+        folded = word.casefold()
+        if len(folded) != len(word):
+            return '|'.join(re.escape(w) for w in ordered)
+        node = trie
+        for ch in folded:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+    return _trie_node_pattern(trie)
+
+
+def _compile_literal_pattern(source: str):
+    """Compile a case-insensitive literal pattern, preferring RE2 when installed."""
+    if re2 is not None:
+        try:
+            return re2.compile('(?i)' + source)
+        except Exception as e:
+            logger.debug(f"RE2 rejected narrative pattern, using re: {e}")
+    return re.compile(source, re.IGNORECASE)
+
+
+@lru_cache(maxsize=64)
+def _narrative_pattern(originals: frozenset):
+    """Compiled narrative pattern for a set of originals, reused across documents."""
+    return _compile_literal_pattern(_literal_trie_pattern(originals))
+
+
 class CCDSanitizer:
     """Main CCD sanitization engine"""
 
     def __init__(self, db_path: str):
         self.db = PHIDatabase(db_path)
         self.phi_gen = PHIGenerator()
-        self.ns = {'hl7': 'urn:hl7-org:v3'}
+        self.ns = NS
         # Cache original org name -> fake org for narrative consistency within run.
         self._org_name_cache = {}
+        # Cache original (given, family) -> fake name so a person keeps one fake within run.
+        self._person_name_cache = {}
+        # Memoized DB-backed fake orgs keyed like the DB hash (name, identity or name).
+        # Stored mappings never change, so entries stay valid for the whole run.
+        self._fake_org_cache = {}
+        # Tag -> (handler, skip inside recordTarget) for the single sanitization walk.
+        # Patient name/addr/telecom are handled by _sanitize_patient; orgs and dates
+        # are sanitized wherever they appear.
+        self._handlers = {
+            TAG_NAME: (self._sanitize_person_name, True),
+            TAG_ADDR: (self._sanitize_address, True),
+            TAG_TELECOM: (self._replace_telecom, True),
+            TAG_HEALTH_CARE_FACILITY: (self._sanitize_facility, False),
+            TAG_VALUE: (self._coarsen_ts_value, False),
+        }
+        self._handlers.update((tag, (self._sanitize_organization, False)) for tag in _ORG_TAGS)
+        self._handlers.update((tag, (self._coarsen_date, False)) for tag in _DATE_TAGS)
 
     def sanitize_file(self, input_path: str, output_path: str) -> Dict[str, Any]:
         """
@@ -38,13 +165,9 @@ class CCDSanitizer:
         """
         logger.info(f"Sanitizing CCD file: {os.path.basename(input_path)}")
 
-        # Read input file
-        with open(input_path, 'r', encoding='utf-8', errors='ignore') as f:
-            xml_content = f.read()
-
-        # Parse CCD
+        # Parse CCD straight from disk
         try:
-            parser = CCDParser(xml_content)
+            parser = CCDParser.from_path(input_path)
         except Exception as e:
             logger.error(f"Failed to parse CCD: {e}")
             raise
@@ -55,19 +178,17 @@ class CCDSanitizer:
         # Track PHI replacements
         phi_count = 0
 
-        # Collect original patient/provider names for free-text scrubbing
-        original_names = set()
-        original_names.update(self._collect_all_person_names(parser))
-        original_org_names = self._collect_all_org_names(parser)
+        # Collect original patient/provider and org names for free-text scrubbing
+        original_names, original_org_names = self._collect_original_names(parser)
 
         # Resolve a primary organization key for stable MRN-per-org mapping.
         primary_org_name = ""
         primary_org_identity = ""
-        ns_uri = 'urn:hl7-org:v3'
-        primary_org_elem = parser.root.find(f'.//{{{ns_uri}}}representedOrganization')
+        # Lazy descendant iteration stops at the first match
+        primary_org_elem = next(parser.root.iterdescendants(TAG_REPRESENTED_ORG), None)
         if primary_org_elem is not None:
-            primary_name_elem = primary_org_elem.find(f'{{{ns_uri}}}name')
-            primary_id_elem = primary_org_elem.find(f'{{{ns_uri}}}id')
+            primary_name_elem = primary_org_elem.find(TAG_NAME)
+            primary_id_elem = primary_org_elem.find(TAG_ID)
             if primary_name_elem is not None and primary_name_elem.text and primary_name_elem.text.strip():
                 primary_org_name = primary_name_elem.text.strip()
             elif primary_id_elem is not None:
@@ -118,10 +239,10 @@ class CCDSanitizer:
 
         # Collect original guardian names
         for guardian in phi_data['guardians']:
-            if guardian.get('first_name'):
-                original_names.add(guardian['first_name'])
-            if guardian.get('last_name'):
-                original_names.add(guardian['last_name'])
+            if guardian.first_name:
+                original_names.add(guardian.first_name)
+            if guardian.last_name:
+                original_names.add(guardian.last_name)
 
         # Collect original provider names
         for provider in phi_data['providers']:
@@ -135,20 +256,9 @@ class CCDSanitizer:
             if org.name:
                 original_org_names.add(org.name)
 
-        # Sanitize ALL person names globally (not just recordTarget)
-        phi_count += self._sanitize_all_person_names(parser, phi_data)
-
-        # Sanitize ALL addresses globally
-        phi_count += self._sanitize_all_addresses(parser)
-
-        # Sanitize ALL telecom globally
-        phi_count += self._sanitize_all_telecom(parser)
-
-        # Sanitize ALL organizations globally (all org-like elements)
-        phi_count += self._sanitize_all_organizations(parser)
-
-        # Sanitize dates (coarsen to year only) - including <value xsi:type="TS">
-        phi_count += self._sanitize_dates(parser)
+        # Sanitize ALL person names, addresses, telecoms and organizations
+        # globally, and coarsen dates (including <value xsi:type="TS">)
+        phi_count += self._sanitize_document(parser)
 
         # Sanitize free-text narrative blocks
         if original_names or original_org_names:
@@ -161,15 +271,21 @@ class CCDSanitizer:
                 mrn_pair
             )
 
-        # Write sanitized output
-        sanitized_xml = parser.to_string()
-
-        # Add XML declaration
-        if not sanitized_xml.startswith('<?xml'):
-            sanitized_xml = '<?xml version="1.0" encoding="UTF-8"?>\n' + sanitized_xml
-
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(sanitized_xml)
+        # Write sanitized output next to the destination and swap it in
+        # atomically, so a failed run never leaves a truncated file at the
+        # final output path. The pid keeps parallel workers apart, and a plain
+        # open() keeps the usual umask permissions (mkstemp would force 0600).
+        output_dir, output_name = os.path.split(output_path)
+        tmp_path = os.path.join(output_dir, f'.tmp_{os.getpid()}_{output_name}')
+        try:
+            parser.write(tmp_path)
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            # The temp file may never have been created (missing directory,
+            # permissions, interrupt); don't mask the original error
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(tmp_path)
+            raise
 
         logger.info(f"✓ Sanitized {phi_count} PHI elements")
 
@@ -203,14 +319,35 @@ class CCDSanitizer:
             patient_id = self.db.get_or_create_patient(
                 original_name, patient_data.dob, fake_patient
             )
+            # A parallel worker may have stored this patient first; the stored
+            # row is authoritative so every output file agrees.
+            stored = self.db.get_patient_by_hash(name_hash)
+            if stored:
+                fake_patient.update(stored)
 
         # Generate address
         if 'address' not in fake_patient:
             fake_patient['address'] = self.phi_gen.generate_address()
 
+        # Collect recordTarget ids, patient names, addresses and telecoms in one
+        # pass over the recordTarget subtrees (document order, as the separate
+        # .//recordTarget//X searches returned them).
+        id_elems, name_elems, addr_elems, telecom_elems = [], [], [], []
+        for record_target in parser.root.iterdescendants(TAG_RECORD_TARGET):
+            for elem in record_target.iter(*_RECORD_TARGET_PART_TAGS):
+                tag = elem.tag
+                if tag == TAG_ID:
+                    id_elems.append(elem)
+                elif tag == TAG_NAME:
+                    if elem.getparent().tag == TAG_PATIENT:
+                        name_elems.append(elem)
+                elif tag == TAG_ADDR:
+                    addr_elems.append(elem)
+                else:
+                    telecom_elems.append(elem)
+
         # Replace patient ID (MRN)
         fake_mrn = ""
-        id_elems = parser.root.findall('.//hl7:recordTarget//hl7:id', self.ns)
         for elem in id_elems:
             if elem.get('extension'):
                 original_mrn = elem.get('extension')
@@ -229,10 +366,9 @@ class CCDSanitizer:
                 logger.debug(f"Replaced patient MRN: {original_mrn} -> {mapped_mrn}")
 
         # Replace patient name
-        name_elems = parser.root.findall('.//hl7:recordTarget//hl7:patient/hl7:name', self.ns)
         for name_elem in name_elems:
-            given_elem = name_elem.find('hl7:given', self.ns)
-            family_elem = name_elem.find('hl7:family', self.ns)
+            given_elem = name_elem.find(TAG_GIVEN)
+            family_elem = name_elem.find(TAG_FAMILY)
 
             if given_elem is not None:
                 given_elem.text = fake_patient['first_name']
@@ -245,14 +381,13 @@ class CCDSanitizer:
             logger.debug(f"Replaced patient name with: {fake_patient['first_name']} {fake_patient['last_name']}")
 
         # Replace patient address
-        addr_elems = parser.root.findall('.//hl7:recordTarget//hl7:addr', self.ns)
         for addr_elem in addr_elems:
             count += self._replace_address_fields(addr_elem, fake_patient['address'])
 
         # Replace phone/email
-        telecom_elems = parser.root.findall('.//hl7:recordTarget//hl7:telecom', self.ns)
+        email_name = (fake_patient['first_name'] or 'user', fake_patient['last_name'] or 'name')
         for telecom in telecom_elems:
-            count += self._replace_telecom(telecom, fake_patient['first_name'], fake_patient['last_name'])
+            count += self._replace_telecom(telecom, email_name)
 
         # Build targeted replacements for narrative free text.
         # These come from the original patient plus the just-generated fake values.
@@ -289,61 +424,72 @@ class CCDSanitizer:
             'mrn_pair': mrn_pair,
         }
 
-    def _sanitize_all_person_names(self, parser: CCDParser, phi_data) -> int:
-        """Sanitize ALL person name elements in the entire document,
-        except recordTarget (already handled by _sanitize_patient)."""
-        count = 0
+    def _sanitize_document(self, parser: CCDParser) -> int:
+        """
+        Sanitize the whole document in a single tree walk
 
-        # Build set of recordTarget name elements to skip
-        record_target_names = set()
-        for elem in parser.root.findall('.//hl7:recordTarget//hl7:name', self.ns):
-            record_target_names.add(elem)
+        Each element is dispatched on its tag to the handler in self._handlers.
+        Person names, addresses and telecoms inside recordTarget are skipped
+        (already handled by _sanitize_patient). Handlers run when an element is
+        entered, so an organization rewrites its own children before the walk
+        reaches them, as the separate per-category passes did.
+        """
+        count = 0
+        handlers = self._handlers
+        record_target_depth = 0
 
-        # Find ALL <name> elements with <given> or <family> children anywhere in doc
-        all_name_elems = parser.root.findall('.//hl7:name', self.ns)
+        for event, elem in etree.iterwalk(parser.root, events=('start', 'end')):
+            tag = elem.tag
+            if tag == TAG_RECORD_TARGET:
+                record_target_depth += 1 if event == 'start' else -1
+                continue
+            if event == 'end':
+                continue
 
-        for name_elem in all_name_elems:
-            if name_elem in record_target_names:
+            entry = handlers.get(tag)
+            if entry is None:
+                continue
+            handler, skip_in_record_target = entry
+            if skip_in_record_target and record_target_depth:
                 continue
+            count += handler(elem)
 
-            given = name_elem.find('hl7:given', self.ns)
-            family = name_elem.find('hl7:family', self.ns)
+        return count
 
-            # Only process if it has structured name parts (person names)
-            if given is None and family is None:
-                continue
+    def _sanitize_person_name(self, name_elem) -> int:
+        """Replace a structured person <name> (given/family parts) with a fake person."""
+        count = 0
 
-            # Generate a fake name for this person
-            fake_person = self.phi_gen.generate_patient()
+        given = name_elem.find(TAG_GIVEN)
+        family = name_elem.find(TAG_FAMILY)
 
-            if given is not None and given.text:
-                given.text = fake_person['first_name']
-                count += 1
-            if family is not None and family.text:
-                family.text = fake_person['last_name']
-                count += 1
+        # Only process if it has structured name parts (person names).
+        # Unstructured names are left to _sanitize_organization / narrative scrubbing.
+        if given is None and family is None:
+            return 0
 
-            # Also handle prefix/suffix if present
-            prefix = name_elem.find('hl7:prefix', self.ns)
-            if prefix is not None and prefix.text:
-                prefix.text = ""
-                count += 1
+        # Reuse the fake name already given to this person, else generate one
+        key = (
+            (given.text or '').strip() if given is not None else '',
+            (family.text or '').strip() if family is not None else '',
+        )
+        fake_person = self._person_name_cache.get(key)
+        if fake_person is None:
+            fake_person = self.phi_gen.generate_person_name()
+            self._person_name_cache[key] = fake_person
 
-        # Also handle unstructured <name> elements (just text, no given/family children)
-        for name_elem in all_name_elems:
-            if name_elem in record_target_names:
-                continue
-            given = name_elem.find('hl7:given', self.ns)
-            family = name_elem.find('hl7:family', self.ns)
-            if given is not None or family is not None:
-                continue  # Already handled above
-            # Plain text name (e.g., <name>John Smith</name>)
-            if name_elem.text and name_elem.text.strip():
-                # Skip if this looks like an organization name (handled separately)
-                parent_tag = ''
-                # We can't easily get parent in ElementTree, so just replace
-                # Organization names will be handled by _sanitize_all_organizations
-                pass
+        if given is not None and given.text:
+            given.text = fake_person['first_name']
+            count += 1
+        if family is not None and family.text:
+            family.text = fake_person['last_name']
+            count += 1
+
+        # Also handle prefix/suffix if present
+        prefix = name_elem.find(TAG_PREFIX)
+        if prefix is not None and prefix.text:
+            prefix.text = ""
+            count += 1
 
         return count
 
@@ -362,60 +508,36 @@ class CCDSanitizer:
             return f"ROOT:{root}"
         return ""
 
-    def _sanitize_all_addresses(self, parser: CCDParser) -> int:
-        """Sanitize ALL address elements in the entire document,
-        except recordTarget (already handled)."""
-        count = 0
-
-        # Build set of recordTarget addr elements to skip
-        record_target_addrs = set()
-        for elem in parser.root.findall('.//hl7:recordTarget//hl7:addr', self.ns):
-            record_target_addrs.add(elem)
-
-        # Find ALL <addr> elements anywhere in doc
-        all_addr_elems = parser.root.findall('.//hl7:addr', self.ns)
-
-        for addr_elem in all_addr_elems:
-            if addr_elem in record_target_addrs:
-                continue
-
-            # Only replace if it has address content
-            street = addr_elem.find('hl7:streetAddressLine', self.ns)
-            city = addr_elem.find('hl7:city', self.ns)
-            if street is not None or city is not None:
-                fake_addr = self.phi_gen.generate_address()
-                count += self._replace_address_fields(addr_elem, fake_addr)
-
-        return count
-
-    def _sanitize_all_telecom(self, parser: CCDParser) -> int:
-        """Sanitize ALL telecom elements in the entire document,
-        except recordTarget (already handled)."""
-        count = 0
-
-        # Build set of recordTarget telecom elements to skip
-        record_target_telecoms = set()
-        for elem in parser.root.findall('.//hl7:recordTarget//hl7:telecom', self.ns):
-            record_target_telecoms.add(elem)
+    def _sanitize_address(self, addr_elem) -> int:
+        """Replace an <addr> that has street/city content with a fake address."""
+        # Only replace if it has address content
+        street = addr_elem.find(TAG_STREET)
+        city = addr_elem.find(TAG_CITY)
+        if street is None and city is None:
+            return 0
 
-        # Find ALL <telecom> elements anywhere in doc
-        all_telecom_elems = parser.root.findall('.//hl7:telecom', self.ns)
+        fake_addr = self.phi_gen.generate_address()
+        return self._replace_address_fields(addr_elem, fake_addr)
 
-        for telecom in all_telecom_elems:
-            if telecom in record_target_telecoms:
-                continue
-            count += self._replace_telecom(telecom)
-
-        return count
-
-    def _collect_all_person_names(self, parser: CCDParser) -> Set[str]:
-        """Collect person names from structured and unstructured <name> nodes."""
+    def _collect_original_names(self, parser: CCDParser) -> Tuple[Set[str], Set[str]]:
+        """
+        Collect person names (structured and unstructured) and org names in
+        one pass over the document's <name> nodes, before anything is replaced.
+        An org name is the first <name> child of an org-like element (see
+        ORG_NAME_TAG_SUFFIXES).
+        """
         names = set()
-        ns_uri = 'urn:hl7-org:v3'
+        org_names = set()
 
-        for name_elem in parser.root.findall(f'.//{{{ns_uri}}}name', self.ns):
-            givens = [g.text.strip() for g in name_elem.findall(f'{{{ns_uri}}}given') if g.text and g.text.strip()]
-            family_elem = name_elem.find(f'{{{ns_uri}}}family')
+        for name_elem in parser.root.iterdescendants(TAG_NAME):
+            if (name_elem.getparent().tag in _ORG_NAME_TAGS
+                    and next(name_elem.itersiblings(TAG_NAME, preceding=True), None) is None):
+                org_text = (name_elem.text or "").strip()
+                if org_text:
+                    org_names.add(org_text)
+
+            givens = [g.text.strip() for g in name_elem.findall(TAG_GIVEN) if g.text and g.text.strip()]
+            family_elem = name_elem.find(TAG_FAMILY)
             family = family_elem.text.strip() if family_elem is not None and family_elem.text and family_elem.text.strip() else ""
 
             # Structured names
@@ -435,131 +557,92 @@ class CCDSanitizer:
             if len(raw_text) >= 3 and any(ch.isalpha() for ch in raw_text):
                 names.add(raw_text)
 
-        return names
+        return names, org_names
 
-    def _collect_all_org_names(self, parser: CCDParser) -> Set[str]:
-        """Collect all organization/facility names from org-like elements."""
-        org_names = set()
-        ns_uri = 'urn:hl7-org:v3'
-        org_tag_suffixes = [
-            'representedOrganization',
-            'representedCustodianOrganization',
-            'serviceProviderOrganization',
-            'providerOrganization',
-            'wholeOrganization',
-            'manufacturerOrganization',
-            'scopingOrganization',
-            'playingEntity',
-        ]
-
-        for suffix in org_tag_suffixes:
-            for org_elem in parser.root.findall(f'.//{{{ns_uri}}}{suffix}', self.ns):
-                name_elem = org_elem.find(f'{{{ns_uri}}}name')
-                if name_elem is not None and name_elem.text and name_elem.text.strip():
-                    org_names.add(name_elem.text.strip())
-
-        return org_names
-
-    def _sanitize_all_organizations(self, parser: CCDParser) -> int:
-        """Sanitize ALL organization-like elements in the entire document.
-        Covers representedOrganization, representedCustodianOrganization,
+    def _sanitize_organization(self, org_elem) -> int:
+        """Sanitize one organization-like element (see ORG_TAG_SUFFIXES):
+        representedOrganization, representedCustodianOrganization,
         serviceProviderOrganization, providerOrganization, wholeOrganization,
-        manufacturerOrganization, scopingOrganization, etc."""
+        manufacturerOrganization, scopingOrganization."""
         count = 0
 
-        # Match all organization-like element tags
-        org_tag_suffixes = [
-            'representedOrganization',
-            'representedCustodianOrganization',
-            'serviceProviderOrganization',
-            'providerOrganization',
-            'wholeOrganization',
-            'manufacturerOrganization',
-            'scopingOrganization',
-        ]
-
-        # Use the namespace-aware tag format
-        ns_uri = 'urn:hl7-org:v3'
-        processed_orgs = set()
-
-        for suffix in org_tag_suffixes:
-            org_elems = parser.root.findall(f'.//{{{ns_uri}}}{suffix}', self.ns)
-
-            for org_elem in org_elems:
-                if id(org_elem) in processed_orgs:
-                    continue
-                processed_orgs.add(id(org_elem))
-
-                # Resolve org identity from first id element using root+extension tuple.
-                original_org_id = ""
-                first_id_elem = org_elem.find(f'{{{ns_uri}}}id')
-                if first_id_elem is not None:
-                    original_org_id = (
-                        first_id_elem.get('extension')
-                        or first_id_elem.get('root')
-                        or ""
-                    )
-                org_identity = self._build_org_identity(first_id_elem)
+        # Resolve org identity from first id element using root+extension tuple.
+        original_org_id = ""
+        first_id_elem = org_elem.find(TAG_ID)
+        if first_id_elem is not None:
+            original_org_id = (
+                first_id_elem.get('extension')
+                or first_id_elem.get('root')
+                or ""
+            )
+        org_identity = self._build_org_identity(first_id_elem)
 
-                # Replace organization name
-                name_elem = org_elem.find(f'{{{ns_uri}}}name')
-                original_name = ""
-                if name_elem is not None and name_elem.text and name_elem.text.strip():
-                    original_name = name_elem.text.strip()
-                else:
-                    original_name = original_org_id or "UNKNOWN_ORG"
-
-                if not org_identity:
-                    org_identity = original_org_id or original_name
-                fake_org = self._get_or_create_fake_org(original_name, org_identity)
-                self._org_name_cache.setdefault(original_name, fake_org)
-
-                if name_elem is not None and name_elem.text and name_elem.text.strip():
-                    name_elem.text = fake_org['name']
-                    count += 1
-
-                # Replace organization ids with stable mapped org id.
-                for id_elem in org_elem.findall(f'{{{ns_uri}}}id'):
-                    old_ext = id_elem.get('extension')
-                    if old_ext != fake_org['facility_id']:
-                        id_elem.set('extension', fake_org['facility_id'])
-                        count += 1
-
-                # Replace organization address
-                addr_elem = org_elem.find(f'{{{ns_uri}}}addr')
-                if addr_elem is not None:
-                    street = addr_elem.find(f'{{{ns_uri}}}streetAddressLine')
-                    city = addr_elem.find(f'{{{ns_uri}}}city')
-                    if street is not None or city is not None:
-                        fake_addr = self.phi_gen.generate_address()
-                        count += self._replace_address_fields(addr_elem, fake_addr)
-
-                # Replace organization telecom
-                telecom = org_elem.find(f'{{{ns_uri}}}telecom')
-                if telecom is not None:
-                    count += self._replace_telecom(telecom)
-
-        # Also handle healthCareFacility/location names
-        for facility_elem in parser.root.findall(f'.//{{{ns_uri}}}healthCareFacility', self.ns):
-            if id(facility_elem) in processed_orgs:
-                continue
-            processed_orgs.add(id(facility_elem))
-            loc = facility_elem.find(f'{{{ns_uri}}}location')
-            if loc is not None:
-                name_elem = loc.find(f'{{{ns_uri}}}name')
-                if name_elem is not None and name_elem.text and name_elem.text.strip():
-                    original_name = name_elem.text.strip()
-                    fake_org = self._get_or_create_fake_org(original_name, original_name)
-                    self._org_name_cache.setdefault(original_name, fake_org)
-                    name_elem.text = fake_org['name']
-                    count += 1
+        # Replace organization name
+        name_elem = org_elem.find(TAG_NAME)
+        original_name = ""
+        if name_elem is not None and name_elem.text and name_elem.text.strip():
+            original_name = name_elem.text.strip()
+        else:
+            original_name = original_org_id or "UNKNOWN_ORG"
+
+        if not org_identity:
+            org_identity = original_org_id or original_name
+        fake_org = self._get_or_create_fake_org(original_name, org_identity)
+        self._org_name_cache.setdefault(original_name, fake_org)
+
+        if name_elem is not None and name_elem.text and name_elem.text.strip():
+            name_elem.text = fake_org['name']
+            count += 1
+
+        # Replace organization ids with stable mapped org id.
+        for id_elem in org_elem.findall(TAG_ID):
+            old_ext = id_elem.get('extension')
+            if old_ext != fake_org['facility_id']:
+                id_elem.set('extension', fake_org['facility_id'])
+                count += 1
+
+        # Replace organization address
+        addr_elem = org_elem.find(TAG_ADDR)
+        if addr_elem is not None:
+            street = addr_elem.find(TAG_STREET)
+            city = addr_elem.find(TAG_CITY)
+            if street is not None or city is not None:
+                fake_addr = self.phi_gen.generate_address()
+                count += self._replace_address_fields(addr_elem, fake_addr)
+
+        # Replace organization telecom
+        telecom = org_elem.find(TAG_TELECOM)
+        if telecom is not None:
+            count += self._replace_telecom(telecom)
 
         return count
 
+    def _sanitize_facility(self, facility_elem) -> int:
+        """Replace a healthCareFacility/location name with a fake org name."""
+        loc = facility_elem.find(TAG_LOCATION)
+        if loc is None:
+            return 0
+
+        name_elem = loc.find(TAG_NAME)
+        if name_elem is not None and name_elem.text and name_elem.text.strip():
+            original_name = name_elem.text.strip()
+            fake_org = self._get_or_create_fake_org(original_name, original_name)
+            self._org_name_cache.setdefault(original_name, fake_org)
+            name_elem.text = fake_org['name']
+            return 1
+
+        return 0
+
     def _get_or_create_fake_org(self, original_name: str, original_identity: str = "") -> Dict:
         """Get or create a fake organization using the database for consistency."""
+        cache_key = (original_name, original_identity or original_name)
+        cached = self._fake_org_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         existing = self.db.get_organization_by_hash(original_name, original_identity)
         if existing:
+            self._fake_org_cache[cache_key] = existing
             return existing
 
         # Generate new
@@ -582,6 +665,7 @@ class CCDSanitizer:
         self.db.get_or_create_organization(original_name, original_identity, db_data)
         created = self.db.get_organization_by_hash(original_name, original_identity)
         if created:
+            self._fake_org_cache[cache_key] = created
             return created
 
         fallback_hash = self.db.hash_value(f"{original_name}|{original_identity}")
@@ -596,41 +680,27 @@ class CCDSanitizer:
             }
         }
 
-    def _sanitize_dates(self, parser: CCDParser) -> int:
-        """Coarsen all dates to year-only for privacy.
-        Handles standard date tags AND <value xsi:type="TS"> elements."""
-        count = 0
-
-        # Standard date element tags
-        date_tags = ['birthTime', 'effectiveTime', 'time', 'low', 'high', 'center']
-
-        for tag in date_tags:
-            date_elems = parser.root.findall(f'.//hl7:{tag}', self.ns)
-
-            for elem in date_elems:
-                value = elem.get('value')
-                if value and len(value) > 4:
-                    # Coarsen to year only (first 4 characters)
-                    year_only = value[:4]
-                    elem.set('value', year_only)
-                    count += 1
-                    logger.debug(f"Coarsened date: {value} -> {year_only}")
-
-        # Handle <value xsi:type="TS" value="YYYYMMDD"/> elements
-        xsi_ns = 'http://www.w3.org/2001/XMLSchema-instance'
-        all_value_elems = parser.root.findall('.//hl7:value', self.ns)
-
-        for elem in all_value_elems:
-            xsi_type = elem.get(f'{{{xsi_ns}}}type', '')
-            if xsi_type == 'TS':
-                value = elem.get('value', '')
-                if value and len(value) > 4:
-                    year_only = value[:4]
-                    elem.set('value', year_only)
-                    count += 1
-                    logger.debug(f"Coarsened TS value: {value} -> {year_only}")
+    def _coarsen_date(self, elem) -> int:
+        """Coarsen a standard date element (see DATE_TAGS) to year only for privacy."""
+        value = elem.get('value')
+        if value and len(value) > 4:
+            # Coarsen to year only (first 4 characters)
+            year_only = value[:4]
+            elem.set('value', year_only)
+            logger.debug(f"Coarsened date: {value} -> {year_only}")
+            return 1
+        return 0
 
-        return count
+    def _coarsen_ts_value(self, elem) -> int:
+        """Coarsen a <value xsi:type="TS" value="YYYYMMDD"/> element to year only."""
+        if elem.get(_XSI_TYPE, '') == 'TS':
+            value = elem.get('value', '')
+            if value and len(value) > 4:
+                year_only = value[:4]
+                elem.set('value', year_only)
+                logger.debug(f"Coarsened TS value: {value} -> {year_only}")
+                return 1
+        return 0
 
     def _sanitize_narrative_text(self, parser: CCDParser,
                                   original_names: Set[str],
@@ -662,72 +732,90 @@ class CCDSanitizer:
         if not replacements:
             return 0
 
-        # Sort by length (longest first) to avoid partial replacements
-        sorted_originals = sorted(replacements.keys(), key=len, reverse=True)
+        # Case-insensitive trie-factored pattern (longest match wins, so no
+        # longest-first sort is needed); documents sharing the same originals
+        # reuse one compiled pattern
+        pattern = _narrative_pattern(frozenset(replacements))
 
-        # Build a case-insensitive regex pattern
-        pattern = re.compile(
-            '|'.join(re.escape(name) for name in sorted_originals),
-            re.IGNORECASE
-        )
+        # Case-insensitive lookup; the first original wins on a collision
+        lookup = {}
+        for original, fake in replacements.items():
+            lookup.setdefault(original.casefold(), fake)
 
         def replace_match(match):
             matched_text = match.group(0)
-            # Find the original key (case-insensitive)
-            for original in sorted_originals:
-                if matched_text.lower() == original.lower():
-                    return replacements[original]
-            return matched_text
+            return lookup.get(matched_text.casefold(), matched_text)
 
-        # Walk all elements and replace text content
-        count += self._walk_and_replace_text(parser.root, pattern, replace_match)
+        passes = [(pattern, replace_match)]
+        originals = list(replacements)
 
         # Replace raw MRN occurrences in narrative text while preserving TX-{mrn}-suffix.
+        # Applied after the name pass on each string, in the same walk.
         if mrn_pair:
             original_mrn, fake_mrn = mrn_pair
             mrn_pattern = re.compile(
                 rf'(?<!TX-){re.escape(original_mrn)}(?!-[A-Za-z0-9])'
             )
-            count += self._walk_and_replace_text(
-                parser.root, mrn_pattern, lambda _: fake_mrn
-            )
+            passes.append((mrn_pattern, lambda _: fake_mrn))
+            originals.append(original_mrn)
 
-        return count
+        # Whitespace-only text (indentation) cannot hold an original with visible characters
+        skip_blank = all(original.strip() for original in originals)
 
-    def _walk_and_replace_text(self, element, pattern, replace_func) -> int:
-        """Recursively walk XML tree and replace text matching pattern."""
-        count = 0
+        # Walk all elements once and replace text content
+        count += self._walk_and_replace_text(parser.root, passes, skip_blank)
 
-        # Replace in element's direct text
-        if element.text and pattern.search(element.text):
-            new_text = pattern.sub(replace_func, element.text)
-            if new_text != element.text:
-                element.text = new_text
-                count += 1
+        return count
 
-        # Replace in element's tail text
-        if element.tail and pattern.search(element.tail):
-            new_tail = pattern.sub(replace_func, element.tail)
-            if new_tail != element.tail:
-                element.tail = new_tail
-                count += 1
+    def _walk_and_replace_text(self, root, passes, skip_blank: bool = False) -> int:
+        """
+        Walk the XML tree once, applying each (pattern, replace_func) pass in
+        order to every text and tail. Counts one replacement per pass that
+        changed a string. With skip_blank, whitespace-only strings are passed
+        over with a C-level isspace() check instead of a regex scan.
+        """
+        count = 0
 
-        # Recurse into children
-        for child in element:
-            count += self._walk_and_replace_text(child, pattern, replace_func)
+        # root.iter() visits every node in document order without recursion
+        for element in root.iter():
+            # Replace in element's direct text
+            text = element.text
+            if text and not (skip_blank and text.isspace()):
+                new_text, changed = self._apply_text_passes(text, passes)
+                if changed:
+                    element.text = new_text
+                    count += changed
+
+            # Replace in element's tail text
+            tail = element.tail
+            if tail and not (skip_blank and tail.isspace()):
+                new_tail, changed = self._apply_text_passes(tail, passes)
+                if changed:
+                    element.tail = new_tail
+                    count += changed
 
         return count
 
+    @staticmethod
+    def _apply_text_passes(value: str, passes):
+        """Run the replacement passes over one string; returns (value, passes that changed it)."""
+        changed = 0
+        for pattern, replace_func in passes:
+            # One scan per pass: subn returns the string untouched when nothing matches
+            new_value, hits = pattern.subn(replace_func, value)
+            if hits and new_value != value:
+                value = new_value
+                changed += 1
+        return value, changed
+
     def _replace_address_fields(self, addr_elem, fake_addr: Dict) -> int:
         """Replace address sub-elements with fake data. Returns count of replacements."""
         count = 0
-        ns_uri = 'urn:hl7-org:v3'
 
-        street_elem = addr_elem.find(f'{{{ns_uri}}}streetAddressLine')
-        city_elem = addr_elem.find(f'{{{ns_uri}}}city')
-        state_elem = addr_elem.find(f'{{{ns_uri}}}state')
-        zip_elem = addr_elem.find(f'{{{ns_uri}}}postalCode')
-        country_elem = addr_elem.find(f'{{{ns_uri}}}country')
+        street_elem = addr_elem.find(TAG_STREET)
+        city_elem = addr_elem.find(TAG_CITY)
+        state_elem = addr_elem.find(TAG_STATE)
+        zip_elem = addr_elem.find(TAG_POSTAL_CODE)
 
         if street_elem is not None and street_elem.text:
             street_elem.text = fake_addr.get('street', fake_addr.get('address', ''))
@@ -744,24 +832,24 @@ class CCDSanitizer:
 
         return count
 
-    def _replace_telecom(self, telecom, first_name: str = '', last_name: str = '') -> int:
-        """Replace a telecom element's value. Returns count of replacements."""
-        value = telecom.get('value', '')
-        if value.startswith('tel:') or value.startswith('fax:'):
-            fake_phone = self.phi_gen.generate_phone()
-            prefix = 'tel:' if value.startswith('tel:') else 'fax:'
-            telecom.set('value', f"{prefix}{fake_phone}")
-            return 1
-        elif value.startswith('mailto:'):
-            fake_email = self.phi_gen.generate_email(
-                first_name or 'user', last_name or 'name'
-            )
-            telecom.set('value', f"mailto:{fake_email}")
-            return 1
-        elif value.startswith('http:') or value.startswith('https:'):
+    def _replace_telecom(self, telecom, email_name: Tuple[str, str] = ('user', 'name')) -> int:
+        """
+        Replace a telecom element's value. Returns count of replacements.
+
+        email_name is the (first, last) pair for generated emails, resolved
+        once by the caller rather than per telecom.
+        """
+        scheme, sep, _ = telecom.get('value', '').partition(':')
+        kind = _TELECOM_KINDS.get(scheme) if sep else None
+        if kind is None:
+            return 0
+        if kind == _TELECOM_PHONE:
+            telecom.set('value', f"{scheme}:{self.phi_gen.generate_phone()}")
+        elif kind == _TELECOM_EMAIL:
+            telecom.set('value', f"mailto:{self.phi_gen.generate_email(*email_name)}")
+        else:
             telecom.set('value', 'https://www.example.com')
-            return 1
-        return 0
+        return 1
 
     def close(self):
         """Close database connection"""
@@ -4,10 +4,14 @@ Comprehensive CCD Sanitizer Validation Script
 Validates that PHI was properly sanitized across 10 CCD files.
 """
 
-import xml.etree.ElementTree as ET
 import re
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from lxml import etree as ET
 
 ORIG_DIR = "/Users/leopak/Downloads/data/data/CCD"
 ANON_DIR = "/Users/leopak/Downloads/data/data/output/CCD"
@@ -27,6 +31,34 @@ FILES = [
 
 NS = {"hl7": "urn:hl7-org:v3"}
 
+# Minimal-work parser: no ID table, entities, comments, PIs or blank text nodes
+PARSER_OPTIONS = dict(collect_ids=False, remove_blank_text=True, resolve_entities=False,
+                      remove_comments=True, remove_pis=True, huge_tree=False)
+_parsers = threading.local()
+
+def xml_parser():
+    """This thread's XMLParser; lxml serializes parses that share one parser across threads."""
+    parser = getattr(_parsers, "parser", None)
+    if parser is None:
+        parser = _parsers.parser = ET.XMLParser(**PARSER_OPTIONS)
+    return parser
+
+# One scan buckets every 4-14 digit value="..." by length (year / partial / full date)
+DATE_VALUE_RE = re.compile(r'value="(\d{4,14})"')
+NON_DIGIT_RE = re.compile(r'[^0-9]')
+
+def date_values(content):
+    """Return (year_only, partial, full) date values found in one pass over content."""
+    year, partial, full = [], [], []
+    for value in DATE_VALUE_RE.findall(content):
+        if len(value) == 4:
+            year.append(value)
+        elif len(value) < 8:
+            partial.append(value)
+        else:
+            full.append(value)
+    return year, partial, full
+
 results = []
 
 def record(check, subcheck, status, detail=""):
@@ -37,56 +69,76 @@ def record(check, subcheck, status, detail=""):
         for line in detail.strip().split("\n"):
             print(f"         {line}")
 
+@lru_cache(maxsize=None)
+def tag(ns_uri, name):
+    """Namespace-qualified tag, built once per (namespace, name) pair."""
+    return f"{{{ns_uri}}}{name}" if ns_uri else name
+
+@lru_cache(maxsize=None)
 def parse_xml(path):
-    """Parse CCD XML, handling namespace prefixes."""
-    tree = ET.parse(path)
+    """Parse CCD XML, handling namespace prefixes (each path parsed once per run)."""
+    tree = ET.parse(path, xml_parser())
     root = tree.getroot()
     # Detect namespace
     ns_match = re.match(r'\{(.+?)\}', root.tag)
     ns = {"hl7": ns_match.group(1)} if ns_match else {}
     return root, ns
 
+@lru_cache(maxsize=None)
+def read_text(path):
+    """Read a sanitized file's text once; CHECK 4 and CHECK 6 scan the same files."""
+    with open(path, "r") as f:
+        return f.read()
+
+def unsanitized_markup(content):
+    """Names of the markup kinds (comments, PIs other than the XML declaration) present in content."""
+    found = []
+    if '<!--' in content:
+        found.append("XML comment")
+    pis = content.count('<?') - (1 if content.startswith('<?xml') else 0)
+    if pis > 0:
+        found.append("processing instruction")
+    return found
+
+def first(root, ns_uri, name):
+    """First element with the given tag in document order, or None (stops walking there)."""
+    return next(root.iter(tag(ns_uri, name)), None)
+
 def extract_patient_phi(root, ns):
     """Extract patient PHI from a CCD XML tree."""
     phi = {}
     prefix = "hl7:" if ns else ""
+    ns_uri = ns.get('hl7', '')
 
-    # Patient name
-    for given in root.iter(f"{{{ns.get('hl7', '')}}}given" if ns else "given"):
-        phi.setdefault("given_names", []).append(given.text)
-    for family in root.iter(f"{{{ns.get('hl7', '')}}}family" if ns else "family"):
-        phi.setdefault("family_names", []).append(family.text)
+    # Patient name (one walk collects both given and family names)
+    given_tag = tag(ns_uri, "given")
+    for el in root.iter(given_tag, tag(ns_uri, "family")):
+        key = "given_names" if el.tag == given_tag else "family_names"
+        phi.setdefault(key, []).append(el.text)
 
     # MRN - look for id under patientRole
-    for pr in root.iter(f"{{{ns.get('hl7', '')}}}patientRole" if ns else "patientRole"):
-        for id_elem in pr.findall(f"{{{ns.get('hl7', '')}}}id" if ns else "id"):
+    pr = first(root, ns_uri, "patientRole")
+    if pr is not None:
+        for id_elem in pr.findall(tag(ns_uri, "id")):
             ext = id_elem.get("extension")
             if ext and not ext.startswith("00000000"):
                 phi.setdefault("mrns", []).append(ext)
                 break
-        break
 
     # DOB
-    for bt in root.iter(f"{{{ns.get('hl7', '')}}}birthTime" if ns else "birthTime"):
+    bt = first(root, ns_uri, "birthTime")
+    if bt is not None:
         phi["dob"] = bt.get("value")
-        break
 
     # Address
-    for addr in root.iter(f"{{{ns.get('hl7', '')}}}streetAddressLine" if ns else "streetAddressLine"):
-        phi["street"] = addr.text
-        break
-    for city in root.iter(f"{{{ns.get('hl7', '')}}}city" if ns else "city"):
-        phi["city"] = city.text
-        break
-    for state in root.iter(f"{{{ns.get('hl7', '')}}}state" if ns else "state"):
-        phi["state"] = state.text
-        break
-    for postal in root.iter(f"{{{ns.get('hl7', '')}}}postalCode" if ns else "postalCode"):
-        phi["zip"] = postal.text
-        break
+    for field, name in (("street", "streetAddressLine"), ("city", "city"),
+                        ("state", "state"), ("zip", "postalCode")):
+        el = first(root, ns_uri, name)
+        if el is not None:
+            phi[field] = el.text
 
     # Phone
-    for tel in root.iter(f"{{{ns.get('hl7', '')}}}telecom" if ns else "telecom"):
+    for tel in root.iter(tag(ns_uri, "telecom")):
         val = tel.get("value", "")
         if val.startswith("tel:"):
             phi["phone"] = val
@@ -99,32 +151,43 @@ def extract_provider_names(root, ns):
     names = set()
     tag_ns = ns.get('hl7', '')
 
-    # Look for assignedPerson, assignedAuthor, etc.
-    for person_tag in ["assignedPerson", "associatedPerson", "informationRecipient"]:
-        for person in root.iter(f"{{{tag_ns}}}{person_tag}" if tag_ns else person_tag):
-            for given in person.iter(f"{{{tag_ns}}}given" if tag_ns else "given"):
-                if given.text:
-                    names.add(given.text)
-            for family in person.iter(f"{{{tag_ns}}}family" if tag_ns else "family"):
-                if family.text:
-                    names.add(family.text)
+    # Look for assignedPerson, assignedAuthor, etc. (all person tags in one walk)
+    person_tags = [tag(tag_ns, t) for t in ("assignedPerson", "associatedPerson", "informationRecipient")]
+    for person in root.iter(*person_tags):
+        for part in person.iter(tag(tag_ns, "given"), tag(tag_ns, "family")):
+            if part.text:
+                names.add(part.text)
     return names
 
 def extract_org_names(root, ns):
-    """Extract organization names."""
+    """Extract organization names (including the custodian org)."""
     orgs = set()
     tag_ns = ns.get('hl7', '')
-    for org in root.iter(f"{{{tag_ns}}}representedOrganization" if tag_ns else "representedOrganization"):
-        for name in org.iter(f"{{{tag_ns}}}name" if tag_ns else "name"):
-            if name.text:
-                orgs.add(name.text)
-    # Also check custodian org
-    for org in root.iter(f"{{{tag_ns}}}representedCustodianOrganization" if tag_ns else "representedCustodianOrganization"):
-        for name in org.iter(f"{{{tag_ns}}}name" if tag_ns else "name"):
+    for org in root.iter(tag(tag_ns, "representedOrganization"),
+                         tag(tag_ns, "representedCustodianOrganization")):
+        for name in org.iter(tag(tag_ns, "name")):
             if name.text:
                 orgs.add(name.text)
     return orgs
 
+def preload(loader, paths):
+    """
+    Parse every input up front on a thread pool (lxml releases the GIL while
+    parsing), filling the loader's cache before the checks run serially.
+    Failures are left for the check that loads the file to report.
+    """
+    def attempt(path):
+        try:
+            loader(path)
+        except Exception:
+            pass
+    with ThreadPoolExecutor(max_workers=min(len(paths), os.cpu_count() or 1)) as ex:
+        list(ex.map(attempt, paths))
+
+
+preload(parse_xml, [os.path.join(ORIG_DIR, f) for f in FILES] +
+        [os.path.join(ANON_DIR, f"ANON_{f}") for f in FILES])
+
 
 # ============================================================
 # CHECK 1: Patient PHI Validation (3 files)
@@ -225,16 +288,11 @@ date_files = FILES[:3]
 for fname in date_files:
     print(f"\n  File: {fname}")
     anon_path = os.path.join(ANON_DIR, f"ANON_{fname}")
-    with open(anon_path, "r") as f:
-        content = f.read()
+    content = read_text(anon_path)
 
-    # Find all value="..." attributes that look like dates
-    # Full dates would be 8+ digits (YYYYMMDD or YYYYMMDDHHMMSS)
-    full_dates = re.findall(r'value="(\d{8,14})"', content)
-    # Year-only dates (4 digits exactly)
-    year_dates = re.findall(r'value="(\d{4})"', content)
-    # Also check for partial dates like YYYYMM (6 digits)
-    partial_dates = re.findall(r'value="(\d{5,7})"', content)
+    # Find all value="..." attributes that look like dates:
+    # year-only (4 digits), partial like YYYYMM (5-7), full 8+ (YYYYMMDD or YYYYMMDDHHMMSS)
+    year_dates, partial_dates, full_dates = date_values(content)
 
     no_full_dates = len(full_dates) == 0 and len(partial_dates) == 0
     detail = f"Year-only dates found: {len(year_dates)}\nFull dates still present (FAIL if >0): {full_dates[:10]}\nPartial dates (FAIL if >0): {partial_dates[:10]}"
@@ -251,7 +309,7 @@ print("=" * 70)
 for fname in FILES:
     anon_path = os.path.join(ANON_DIR, f"ANON_{fname}")
     try:
-        ET.parse(anon_path)
+        parse_xml(anon_path)
         record("XML Valid", f"{fname[:8]}... valid XML", True)
     except ET.ParseError as e:
         record("XML Valid", f"{fname[:8]}... valid XML", False, f"Parse error: {e}")
@@ -273,8 +331,7 @@ for fname in leakage_files:
     orig_root, orig_ns = parse_xml(orig_path)
     orig_phi = extract_patient_phi(orig_root, orig_ns)
 
-    with open(anon_path, "r") as f:
-        anon_content = f.read()
+    anon_content = read_text(anon_path)
 
     # Build list of PHI strings to check
     phi_strings = []
@@ -289,21 +346,25 @@ for fname in leakage_files:
             phi_strings.append(mrn)
     if orig_phi.get("phone"):
         # Extract just the number
-        phone_num = re.sub(r'[^0-9]', '', orig_phi["phone"])
+        phone_num = NON_DIGIT_RE.sub('', orig_phi["phone"])
         if len(phone_num) >= 7:
             phi_strings.append(phone_num[-10:])  # last 10 digits
     if orig_phi.get("street"):
         phi_strings.append(orig_phi["street"])
 
-    leaked = []
-    for phi_str in phi_strings:
-        if phi_str and phi_str in anon_content:
-            leaked.append(phi_str)
+    # Names repeat across the document; scan the content once per distinct string
+    found = {phi_str: phi_str in anon_content for phi_str in set(phi_strings) if phi_str}
+    leaked = [phi_str for phi_str in phi_strings if phi_str and found[phi_str]]
 
     no_leakage = len(leaked) == 0
     detail = f"Checked PHI strings: {phi_strings}\nLeaked into sanitized file: {leaked if leaked else 'None'}"
     record("PHI Leakage", f"{fname[:8]}... no PHI leakage", no_leakage, detail)
 
+    # Comments survive parsing unless dropped, and can carry PHI verbatim
+    markup = unsanitized_markup(anon_content)
+    record("PHI Leakage", f"{fname[:8]}... no comments or processing instructions",
+           not markup, f"Found: {', '.join(markup)}" if markup else "")
+
 
 # ============================================================
 # CHECK 7: MRN Format Check (all 10 files)
@@ -342,6 +403,10 @@ for fname in FILES:
     detail = f"Original MRN: {orig_mrn}\nSanitized MRN: {anon_mrn}\nExpected pattern: TX-{orig_mrn}-{{suffix}}"
     record("MRN Format", f"{fname[:8]}... MRN format", matches, detail)
 
+# All checks done; drop the parsed trees before the summary
+parse_xml.cache_clear()
+read_text.cache_clear()
+
 
 # ============================================================
 # SUMMARY
@@ -293,47 +293,51 @@ def main():
     # Initialize sanitizer
     sanitizer = PHISanitizer(config.DB_FILE)
     
-    # Process files
+    # Process files. Single writer: commit new mappings once per
+    # config.DB_COMMIT_FILES files instead of once per file.
     files_processed = []
-    
-    for i, input_path in enumerate(input_files, 1):
-        logger.info(f"\n[{i}/{len(input_files)}] Processing: {os.path.basename(input_path)}")
-        
-        try:
-            result = sanitizer.sanitize_file(input_path, "temp_output.txt")
-            
-            # Generate proper output filename (preserves subdirectory structure)
-            output_filename = generate_output_filename(input_path, result['message_type'], config.INPUT_DIR)
-            output_path = os.path.join(config.OUTPUT_DIR, output_filename)
-            
-            # Create subdirectories in output if needed
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            
-            # Move temp file to proper location
-            os.rename("temp_output.txt", output_path)
-            
-            files_processed.append({
-                'input_path': input_path,
-                'output_path': output_path,
-                'output_filename': output_filename,
-                'message_type': result['message_type'],
-                'phi_count': result['phi_count'],
-                'status': 'success'
-            })
-            
-            logger.info(f"✓ Success: {output_filename}")
-            
-        except Exception as e:
-            logger.error(f"✗ Failed: {str(e)}", exc_info=True)
-            files_processed.append({
-                'input_path': input_path,
-                'output_path': '',
-                'output_filename': os.path.basename(input_path),
-                'message_type': 'UNKNOWN',
-                'phi_count': 0,
-                'status': 'failed',
-                'error': str(e)
-            })
+    total = len(input_files)
+    step = max(1, config.DB_COMMIT_FILES)
+    for start in range(0, total, step):
+        with sanitizer.db.batch():
+            for i, input_path in enumerate(input_files[start:start + step], start + 1):
+                logger.info(f"\n[{i}/{total}] Processing: {os.path.basename(input_path)}")
+                
+                try:
+                    result = sanitizer.sanitize_file(input_path, "temp_output.txt")
+                    
+                    # Generate proper output filename (preserves subdirectory structure)
+                    output_filename = generate_output_filename(input_path, result['message_type'], config.INPUT_DIR)
+                    output_path = os.path.join(config.OUTPUT_DIR, output_filename)
+                    
+                    # Create subdirectories in output if needed
+                    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                    
+                    # Move temp file to proper location
+                    os.rename("temp_output.txt", output_path)
+                    
+                    files_processed.append({
+                        'input_path': input_path,
+                        'output_path': output_path,
+                        'output_filename': output_filename,
+                        'message_type': result['message_type'],
+                        'phi_count': result['phi_count'],
+                        'status': 'success'
+                    })
+                    
+                    logger.info(f"✓ Success: {output_filename}")
+                    
+                except Exception as e:
+                    logger.error(f"✗ Failed: {str(e)}", exc_info=True)
+                    files_processed.append({
+                        'input_path': input_path,
+                        'output_path': '',
+                        'output_filename': os.path.basename(input_path),
+                        'message_type': 'UNKNOWN',
+                        'phi_count': 0,
+                        'status': 'failed',
+                        'error': str(e)
+                    })
     
     # Get database stats
     db_stats = sanitizer.db.get_stats()
@@ -9,6 +9,15 @@ from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
 
+# Valid HL7 v2.x message types we support
+VALID_MESSAGE_TYPES = frozenset(('ADT', 'ORU', 'MDM', 'VXU', 'TRN'))
+# MSH-9 is standard; some systems put the type in MSH-10 or MSH-11
+_MSG_TYPE_POSITIONS = (9, 10, 11)
+# MSH-12 normally; non-standard messages shift the version right
+_VERSION_POSITIONS = (12, 13, 14)
+# A whole ^-delimited component of exactly 10 digits (provider NPI)
+_NPI_COMPONENT_RE = re.compile(r'(?:\A|\^)(\d{10})(?=\^|\Z)')
+
 
 @dataclass
 class HL7Field:
@@ -25,50 +34,37 @@ class HL7Parser:
     def __init__(self, message: str):
         self.raw_message = message
         self.segments = {}
+        # (segment name, fields) in message order; the fields lists are the
+        # same objects as in self.segments, so field replacements show up here
+        self._segment_order = []
         self.message_type = None
         self.version = None
+        # (segment, field_num, instance) -> (field string, its '^' components)
+        self._component_cache = {}
         self._parse()
     
     def _parse(self):
         """Parse message into segments"""
         lines = self.raw_message.strip().split('\n')
+        segments = self.segments
+        segment_order = self._segment_order
         
         for line in lines:
-            if not line.strip():
+            # isspace() answers the blank-line test without building a stripped copy
+            if not line or line.isspace():
                 continue
             
-            # Split by pipe, but handle MSH specially (MSH has encoding chars in position 1-2)
-            if line.startswith('MSH'):
+            parts = line.split('|')
+            segment_name = parts[0]
+            # parts[0] starts with MSH exactly when the line does; MSH has its
+            # encoding chars in position 1-2 so it is rebuilt separately
+            if segment_name.startswith('MSH'):
                 segment_name = 'MSH'
-                # MSH can be in two formats:
-                # Format 1: MSH|^~\&|field3|field4... (pipe after MSH)
-                # Format 2: MSH^~\&|field3|field4... (NO pipe, encoding chars attached to MSH)
-                
-                parts = line.split('|')
-                
-                if parts[0] == 'MSH':
-                    # Format 1: MSH|^~\&|...
-                    # parts = ['MSH', '^~\&', 'field3', ...]
-                    # Build: ['MSH', '|', '^~\&', 'field3', ...]
-                    if len(parts) > 1:
-                        fields = ['MSH', '|', parts[1]] + parts[2:]
-                    else:
-                        fields = ['MSH', '|', '^~\\&']
-                else:
-                    # Format 2: MSH^~\&|...
-                    # parts[0] = 'MSH^~\&', parts[1] = 'field3', ...
-                    # Extract encoding chars and build: ['MSH', '|', '^~\&', 'field3', ...]
-                    encoding_chars = parts[0][3:] if len(parts[0]) > 3 else '^~\\&'
-                    fields = ['MSH', '|', encoding_chars] + parts[1:]
-            else:
-                parts = line.split('|')
-                segment_name = parts[0]
-                fields = parts
+                parts = self._msh_fields(parts)
             
             # Store segment (handle multiple instances like NK1, IN1)
-            if segment_name not in self.segments:
-                self.segments[segment_name] = []
-            self.segments[segment_name].append(fields)
+            segments.setdefault(segment_name, []).append(parts)
+            segment_order.append((segment_name, parts))
         
         # Extract message type and version
         self._extract_metadata()
@@ -76,26 +72,44 @@ class HL7Parser:
         logger.debug(f"Parsed HL7 message: {self.message_type} v{self.version}")
         logger.debug(f"Segments found: {list(self.segments.keys())}")
     
+    @staticmethod
+    def _msh_fields(parts: List[str]) -> List[str]:
+        """
+        Build MSH fields from a split MSH line
+        
+        MSH can be in two formats:
+        Format 1: MSH|^~\\&|field3|field4... (pipe after MSH)
+        Format 2: MSH^~\\&|field3|field4... (NO pipe, encoding chars attached to MSH)
+        Both become ['MSH', '|', '^~\\&', 'field3', ...]
+        """
+        if parts[0] == 'MSH':
+            # Format 1: parts = ['MSH', '^~\&', 'field3', ...]
+            if len(parts) > 1:
+                return ['MSH', '|', parts[1]] + parts[2:]
+            return ['MSH', '|', '^~\\&']
+        # Format 2: parts[0] = 'MSH^~\&', parts[1] = 'field3', ...
+        encoding_chars = parts[0][3:] if len(parts[0]) > 3 else '^~\\&'
+        return ['MSH', '|', encoding_chars] + parts[1:]
+    
     def _extract_metadata(self):
         """Extract message type and version from MSH"""
         if 'MSH' in self.segments:
             msh = self.segments['MSH'][0]
-            
-            # Valid HL7 v2.x message types we support
-            valid_types = ['ADT', 'ORU', 'MDM', 'VXU', 'TRN']
+            # _parse stores split() tokens, so every field is already a str
+            n_fields = len(msh)
             
             # MSH-9: Message Type (e.g., ADT^A08) - standard position
             # Some systems put it in MSH-10 or MSH-11, so check multiple positions
             msg_type_field = None
             
             # Try MSH-9, MSH-10, MSH-11 in order, looking for valid message types
-            for field_num in [9, 10, 11]:
-                if len(msh) > field_num and msh[field_num]:
-                    candidate = str(msh[field_num])
+            for field_num in _MSG_TYPE_POSITIONS:
+                if n_fields > field_num and msh[field_num]:
+                    candidate = msh[field_num]
                     # Check if it contains a valid message type
                     if '^' in candidate:
-                        msg_prefix = candidate.split('^')[0]
-                        if msg_prefix in valid_types:
+                        msg_prefix = candidate.partition('^')[0]
+                        if msg_prefix in VALID_MESSAGE_TYPES:
                             msg_type_field = candidate
                             if field_num != 9:
                                 logger.debug(f"Non-standard MSH: message type found in MSH-{field_num} instead of MSH-9")
@@ -103,7 +117,7 @@ class HL7Parser:
             
             if msg_type_field:
                 if '^' in msg_type_field:
-                    parts = msg_type_field.split('^')
+                    parts = msg_type_field.split('^', 2)
                     self.message_type = f"{parts[0]}^{parts[1]}"
                 else:
                     self.message_type = msg_type_field
@@ -114,9 +128,9 @@ class HL7Parser:
             
             # MSH-12 or MSH-13: Version (e.g., 2.3.1) - position may vary
             # Try both positions due to non-standard messages
-            for ver_pos in [12, 13, 14]:
-                if len(msh) > ver_pos and msh[ver_pos]:
-                    ver_str = str(msh[ver_pos])
+            for ver_pos in _VERSION_POSITIONS:
+                if n_fields > ver_pos and msh[ver_pos]:
+                    ver_str = msh[ver_pos]
                     # Check if it looks like a version (contains dots)
                     if '.' in ver_str and ver_str[0].isdigit():
                         self.version = ver_str
@@ -144,15 +158,26 @@ class HL7Parser:
         
         field_value = seg_data[field_num]
         
-        # If component requested, split by ^
+        # If component requested, split by ^ (once per field value)
         if component_num > 0 and '^' in field_value:
-            components = field_value.split('^')
+            components = self._components(segment, field_num, instance, field_value)
             if component_num <= len(components):
                 return components[component_num - 1]
             return None
         
         return field_value
     
+    def _components(self, segment: str, field_num: int, instance: int,
+                    field_value: str) -> List[str]:
+        """Split a field on ^, reusing the last split while the field is unchanged"""
+        key = (segment, field_num, instance)
+        cached = self._component_cache.get(key)
+        # The identity check also catches fields rewritten outside replace_field
+        if cached is None or cached[0] is not field_value:
+            cached = (field_value, field_value.split('^'))
+            self._component_cache[key] = cached
+        return cached[1]
+    
     def get_all_instances(self, segment: str) -> List[List[str]]:
         """Get all instances of a repeating segment"""
         return self.segments.get(segment, [])
@@ -201,7 +226,7 @@ class HL7Parser:
         # PID-3: Patient ID (MRN)
         mrn = self.get_field('PID', 3, 0)
         if '^' in mrn:
-            mrn = mrn.split('^')[0]  # Take first component
+            mrn = mrn.partition('^')[0]  # Take first component
         
         # PID-5: Patient Name (Last^First^Middle)
         name = self.get_field('PID', 5, 0)
@@ -255,13 +280,10 @@ class HL7Parser:
         
         # NK1-2: Name
         name = nk1_segment[2] if len(nk1_segment) > 2 else ""
-        if '^' in name:
-            parts = name.split('^')
-            last_name = parts[0] if len(parts) > 0 else ""
-            first_name = parts[1] if len(parts) > 1 else ""
-        else:
-            last_name = name
-            first_name = ""
+        # Only the first two components are used; without a ^ the whole
+        # value is the last name and rest is empty
+        last_name, _, rest = name.partition('^')
+        first_name = rest.partition('^')[0]
         
         # NK1-4: Address
         address = nk1_segment[4] if len(nk1_segment) > 4 else ""
@@ -304,21 +326,25 @@ class HL7Parser:
     
     def _parse_provider_field(self, field: str) -> Optional[Dict]:
         """Parse provider from field like: ID^Last^First^MI^^^^^NPI"""
-        if not field or '^' not in field:
+        if not field:
             return None
         
-        parts = field.split('^')
+        # Components 0-7 split out; parts[8], when present, is the rest of
+        # the field from the 9th component on. A single part means no ^.
+        parts = field.split('^', 8)
+        if len(parts) == 1:
+            return None
         
-        provider_id = parts[0] if len(parts) > 0 else ""
-        last_name = parts[1] if len(parts) > 1 else ""
+        provider_id = parts[0]
+        last_name = parts[1]
         first_name = parts[2] if len(parts) > 2 else ""
         
-        # NPI often in position 9 or later
+        # NPI often in position 9 or later: first all-digit 10-char component
         npi = ""
-        for i in range(8, len(parts)):
-            if parts[i] and parts[i].isdigit() and len(parts[i]) == 10:
-                npi = parts[i]
-                break
+        if len(parts) > 8:
+            match = _NPI_COMPONENT_RE.search(parts[8])
+            if match:
+                npi = match.group(1)
         
         if last_name or first_name:
             return {
@@ -372,27 +398,30 @@ class HL7Parser:
         if component_num == 0:
             # Replace entire field
             seg_data[field_num] = new_value
+            self._component_cache.pop((segment, field_num, instance), None)
         else:
-            # Replace component
-            field_value = seg_data[field_num]
-            components = field_value.split('^')
+            # Replace component, editing the cached split in place so a second
+            # component edit on the same field (e.g. PID-5 last/first) skips the split
+            components = self._components(segment, field_num, instance, seg_data[field_num])
             if component_num <= len(components):
                 components[component_num - 1] = new_value
-                seg_data[field_num] = '^'.join(components)
+                joined = '^'.join(components)
+                seg_data[field_num] = joined
+                self._component_cache[(segment, field_num, instance)] = (joined, components)
     
     def to_string(self) -> str:
-        """Convert parsed message back to HL7 string"""
+        """Convert parsed message back to HL7 string, segments in message order"""
         lines = []
         
-        for segment_name in self.segments:
-            for seg_data in self.segments[segment_name]:
-                if segment_name == 'MSH':
-                    # Special handling for MSH
-                    # MSH structure: ['MSH', '|', '^~\&', 'field3', 'field4', ...]
-                    # Output: MSH|^~\&|field3|field4|...
-                    line = seg_data[0] + seg_data[1] + seg_data[2] + '|' + '|'.join(seg_data[3:])
-                else:
-                    line = '|'.join(seg_data)
-                lines.append(line)
+        for segment_name, seg_data in self._segment_order:
+            if segment_name == 'MSH':
+                # Special handling for MSH
+                # MSH structure: ['MSH', '|', '^~\&', 'field3', 'field4', ...]
+                # Output: MSH|^~\&|field3|field4|...
+                # One join builds the line without intermediate concatenations
+                line = ''.join((seg_data[0], seg_data[1], seg_data[2], '|', '|'.join(seg_data[3:])))
+            else:
+                line = '|'.join(seg_data)
+            lines.append(line)
         
         return '\n'.join(lines)
@@ -2,29 +2,51 @@
 Generate realistic fake PHI data
 Uses Faker library for names, addresses, etc.
 """
+import hashlib
 import random
 import re
 import string
 import logging
+from functools import lru_cache
 from typing import Dict, Optional
 import config
 
 logger = logging.getLogger(__name__)
 
-# Will install Faker library when needed
+# Faker is a hard dependency (requirements.txt); never pip-install at runtime
 try:
     from faker import Faker
-    fake = Faker('en_US')
-except ImportError:
-    fake = None
-    logger.warning("Faker library not installed. Will install on first use.")
+except ImportError as e:
+    raise ImportError(
+        "Faker library not installed. Install it with: pip install -r requirements.txt"
+    ) from e
+fake = Faker('en_US')
+
+# Bound methods of the module-level RNG, looked up once. They still draw from
+# random's shared instance, so random.seed() (e.g. per worker in main.py)
+# keeps controlling every generated value.
+_choice = random.choice
+_choices = random.choices
+_randint = random.randint
+_randrange = random.randrange
+_random = random.random
+
+# Texas area codes for generated phone numbers
+TEXAS_AREA_CODES = ('210', '214', '254', '281', '325', '361', '409', '432',
+                    '469', '512', '682', '713', '737', '806', '817', '830',
+                    '832', '903', '915', '936', '940', '956', '972', '979')
+
+# Standard EMR names that original sending applications are mapped onto
+VALID_EMRS = ('EPIC', 'Cerner', 'eCW', 'Meditech', 'NetSmart')
+
+_MRN_PREFIX_STRIP_RE = re.compile(r'[^A-Z0-9]+')
+_MRN_SUFFIX_CHARS = string.ascii_uppercase + string.digits
 
 
 class PHIGenerator:
     """Generates realistic fake PHI data"""
     
     def __init__(self):
-        self._ensure_faker()
         # Texas cities with ZIP codes and coordinates
         self.texas_locations = [
             {"city": "Houston", "zip": "77002", "lat": 29.7604, "lon": -95.3698},
@@ -46,17 +68,16 @@ class PHIGenerator:
             {"city": "Oklahoma City", "state": "OK", "zip": "73102", "lat": 35.4676, "lon": -97.5164},
             {"city": "Little Rock", "state": "AR", "zip": "72201", "lat": 34.7465, "lon": -92.2896},
         ]
-    
-    def _ensure_faker(self):
-        """Ensure Faker is installed"""
-        global fake
-        if fake is None:
-            logger.info("Installing Faker library...")
-            import subprocess
-            subprocess.check_call(['pip', 'install', 'faker', '--break-system-packages', '-q'])
-            from faker import Faker
-            fake = Faker('en_US')
-            logger.info("Faker library installed successfully")
+        
+        # Same locations as flat tuples so generate_address unpacks one pick
+        # instead of doing a key lookup per field
+        self._texas_picks = tuple(
+            (loc['city'], loc['zip'], loc['lat'], loc['lon']) for loc in self.texas_locations
+        )
+        self._other_picks = tuple(
+            (loc['city'], loc['state'], loc['zip'], loc['lat'], loc['lon'])
+            for loc in self.other_locations
+        )
     
     def generate_patient(self, original_dob: Optional[str] = None) -> Dict[str, str]:
         """Generate fake patient data"""
@@ -69,7 +90,7 @@ class PHIGenerator:
                 # Parse original DOB (format: YYYYMMDD)
                 year = int(original_dob[:4])
                 # Keep within ±5 years
-                fake_year = year + random.randint(-5, 5)
+                fake_year = year + _randint(-5, 5)
                 fake_dob = fake.date_of_birth(minimum_age=0, maximum_age=100)
                 fake_dob = fake_dob.replace(year=fake_year)
                 fake_dob_str = fake_dob.strftime("%Y%m%d")
@@ -90,25 +111,23 @@ class PHIGenerator:
             'ssn': fake_ssn
         }
     
+    def generate_person_name(self) -> Dict[str, str]:
+        """Generate a fake first/last name only (no DOB or SSN)"""
+        return {
+            'first_name': fake.first_name(),
+            'last_name': fake.last_name()
+        }
+    
     def generate_address(self, use_texas: bool = True) -> Dict[str, str]:
         """Generate fake address (primarily Texas-based)"""
         # Decide if using Texas or out-of-state
-        if use_texas or random.random() > config.OUT_OF_STATE_PROBABILITY:
+        if use_texas or _random() > config.OUT_OF_STATE_PROBABILITY:
             # Use Texas location
-            location = random.choice(self.texas_locations)
+            city, zip_code, lat, lon = _choice(self._texas_picks)
             state = config.DEFAULT_STATE
-            city = location['city']
-            zip_code = location['zip']
-            lat = location['lat']
-            lon = location['lon']
         else:
             # Use out-of-state location
-            location = random.choice(self.other_locations)
-            state = location['state']
-            city = location['city']
-            zip_code = location['zip']
-            lat = location['lat']
-            lon = location['lon']
+            city, state, zip_code, lat, lon = _choice(self._other_picks)
         
         # Generate street address
         street = fake.street_address()
@@ -134,8 +153,8 @@ class PHIGenerator:
             "Healthcare",
             "Regional Medical",
         ]
-        facility_id = ''.join(random.choices('ABCDEFGHIJKLMNOPQRSTUVWXYZ', k=random.choice([3, 4])))
-        org_name = f"{fake.city()} {random.choice(org_types)}"
+        facility_id = ''.join(_choices('ABCDEFGHIJKLMNOPQRSTUVWXYZ', k=_choice([3, 4])))
+        org_name = f"{fake.city()} {_choice(org_types)}"
         address_data = self.generate_address(use_texas=True)
 
         logger.debug(f"Generated organization: {org_name} ({facility_id})")
@@ -151,8 +170,8 @@ class PHIGenerator:
         first_name = fake.first_name()
         last_name = fake.last_name()
         
-        # Generate fake NPI (10 digits)
-        npi = ''.join([str(random.randint(0, 9)) for _ in range(10)])
+        # Generate fake NPI (10 digits, leading zeros allowed) in one draw
+        npi = f"{_randrange(10 ** 10):010d}"
         
         logger.debug(f"Generated provider: {first_name} {last_name}, NPI: {npi}")
         
@@ -164,38 +183,36 @@ class PHIGenerator:
     
     def generate_phone(self) -> str:
         """Generate fake phone number"""
-        # Texas area codes
-        texas_area_codes = ['210', '214', '254', '281', '325', '361', '409', '432', 
-                           '469', '512', '682', '713', '737', '806', '817', '830', 
-                           '832', '903', '915', '936', '940', '956', '972', '979']
+        area_code = _choice(TEXAS_AREA_CODES)
+        # Draw all 7 subscriber digits as one number
+        digits = f"{_randrange(10 ** 7):07d}"
         
-        area_code = random.choice(texas_area_codes)
-        exchange = ''.join([str(random.randint(0, 9)) for _ in range(3)])
-        number = ''.join([str(random.randint(0, 9)) for _ in range(4)])
-        
-        return f"({area_code}){exchange}-{number}"
+        return f"({area_code}){digits[:3]}-{digits[3:]}"
     
     def generate_employer_name(self) -> str:
         """Generate fake employer/company name"""
         return f"{fake.company()} Corp"
     
-    def generate_emr_name(self, original_emr: str) -> str:
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def generate_emr_name(original_emr: str) -> str:
         """
         Map EMR name to standard list for consistency
         Valid EMRs: EPIC, Cerner, eCW, Meditech, NetSmart
+        Pure and keyed on a short string, so memoized (feeds repeat sources).
         """
-        # Hash the original to get consistent mapping
-        import hashlib
-        hash_val = int(hashlib.sha256(original_emr.encode()).hexdigest(), 16)
+        # Hash the original to get consistent mapping (the full digest as an
+        # int, same value int(hexdigest, 16) gave, so mappings don't move)
+        hash_val = int.from_bytes(hashlib.sha256(original_emr.encode()).digest(), 'big')
         
-        valid_emrs = ['EPIC', 'Cerner', 'eCW', 'Meditech', 'NetSmart']
-        return valid_emrs[hash_val % len(valid_emrs)]
+        return VALID_EMRS[hash_val % len(VALID_EMRS)]
     
     @staticmethod
+    @lru_cache(maxsize=128)
     def _normalize_mrn_prefix(org_prefix: Optional[str]) -> str:
-        """Normalize MRN prefix to alphanumeric uppercase text."""
+        """Normalize MRN prefix to alphanumeric uppercase text (memoized per prefix)."""
         prefix = (org_prefix or config.MRN_PREFIX or "MRN").upper()
-        prefix = re.sub(r'[^A-Z0-9]+', '', prefix)
+        prefix = _MRN_PREFIX_STRIP_RE.sub('', prefix)
         return prefix or "MRN"
 
     def generate_mrn(self, original_mrn: str, org_prefix: Optional[str] = None) -> str:
@@ -204,7 +221,7 @@ class PHIGenerator:
         Does not embed original MRN to avoid raw identifier leakage.
         """
         suffix_len = max(config.MRN_SUFFIX_LENGTH, 4)
-        suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=suffix_len))
+        suffix = ''.join(_choices(_MRN_SUFFIX_CHARS, k=suffix_len))
         fake_mrn = f"{self._normalize_mrn_prefix(org_prefix)}-{suffix}"
 
         logger.debug(f"Generated MRN: {original_mrn} -> {fake_mrn}")
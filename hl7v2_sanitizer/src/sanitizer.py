@@ -4,9 +4,16 @@ Coordinates parsing, PHI extraction, fake data generation, and replacement
 """
 import re
 import logging
+import tempfile
 from typing import Dict, List, Tuple, Optional
 from pathlib import Path
 
+# RE2 (google-re2) scans in guaranteed linear time; fall back to re if absent
+try:
+    import re2
+except ImportError:
+    re2 = None
+
 from src.hl7_parser import HL7Parser
 from src.phi_generator import PHIGenerator
 from src.database import PHIDatabase
@@ -14,6 +21,85 @@ from src.database import PHIDatabase
 logger = logging.getLogger(__name__)
 
 
+def _compile_free_text_pattern(source: str):
+    """Compile a free-text hardening pattern, preferring RE2 when installed."""
+    if re2 is not None:
+        try:
+            return re2.compile(source)
+        except Exception as e:
+            logger.debug(f"RE2 rejected hardening pattern, using re: {e}")
+    return re.compile(source)
+
+
+# Free-text hardening patterns, compiled once (applied in this order).
+# The two open-ended ones backtrack under re on long capitalized runs.
+_EDU_INSTITUTION_RE = _compile_free_text_pattern(
+    r'\b[A-Z][A-Z\s&\-\.]+\s+(SCHOOL|COLLEGE|UNIVERSITY|ACADEMY|INSTITUTE)\b'
+)
+_STREET_ADDRESS_RE = _compile_free_text_pattern(
+    r'\b\d{1,5}\s+[A-Z][A-Za-z\s]+\s+(AVE|AVENUE|RD|ROAD|ST|STREET|BLVD|BOULEVARD|DR|DRIVE|LN|LANE|WAY|PKWY|PARKWAY)\b'
+)
+_SJSY_RE = re.compile(r'\bSJSY\b')
+_SJHS_RE = re.compile(r'\bSJHS\b')
+_DR_NAME_RE = re.compile(r'\bDr\.?\s+([A-Z][a-z]+)\b')
+_NY_ZIP_RE = re.compile(r'\bNY\s+1\d{4}\b')
+_AREA_CODE_RE = re.compile(r'\b315\b')
+
+
+def _ascii_variant(pattern):
+    """re.ASCII twin of a compiled re pattern; RE2 patterns are returned as is."""
+    if not isinstance(pattern, re.Pattern):
+        return pattern
+    return re.compile(pattern.pattern, (pattern.flags & ~re.UNICODE) | re.ASCII)
+
+
+# On plain ASCII text (nearly every HL7 message) the re.ASCII twins match
+# exactly the same spans while skipping Unicode \b/\s/\d lookups
+_FREE_TEXT_RES = (
+    _EDU_INSTITUTION_RE, _STREET_ADDRESS_RE, _SJSY_RE, _SJHS_RE,
+    _DR_NAME_RE, _NY_ZIP_RE, _AREA_CODE_RE,
+)
+_FREE_TEXT_ASCII_RES = tuple(_ascii_variant(pattern) for pattern in _FREE_TEXT_RES)
+
+
+def _is_plain_ascii(text: str) -> bool:
+    """
+    True when re.ASCII cannot change a match: the text is ASCII and has none
+    of the \x1c-\x1f separators (MLLP's end-of-block is \x1c), which only
+    Unicode \s treats as whitespace.
+    """
+    return text.isascii() and not any(sep in text for sep in '\x1c\x1d\x1e\x1f')
+
+
+# NY city names (both casings) mapped to Texas cities
+NY_TO_TX_CITIES = {
+    'SYRACUSE': 'HOUSTON',
+    'Syracuse': 'Houston',
+    'SAN ANTONIO': 'DALLAS',
+    'San Antonio': 'Dallas',
+    'ROCHESTER': 'AUSTIN',
+    'Rochester': 'Austin',
+    'ALBANY': 'FORT WORTH',
+    'Albany': 'Fort Worth',
+    'BUFFALO': 'EL PASO',
+    'Buffalo': 'El Paso',
+    'FULTON': 'ARLINGTON',
+    'Fulton': 'Arlington',
+    'DOBBS FERRY': 'PLANO',
+    'Dobbs Ferry': 'Plano',
+    'GREENWICH': 'CORPUS CHRISTI',
+    'Greenwich': 'Corpus Christi',
+    'BALDWINSVILLE': 'LAREDO',
+    'Baldwinsville': 'Laredo',
+    'LIVONIA': 'AMARILLO',
+    'Livonia': 'Amarillo',
+}
+# All cities in one pass; longest first so a name never loses to a shorter prefix
+_NY_CITY_RE = re.compile('|'.join(
+    re.escape(city) for city in sorted(NY_TO_TX_CITIES, key=len, reverse=True)
+))
+
+
 class PHISanitizer:
     """Main PHI sanitization orchestrator"""
     
@@ -21,6 +107,13 @@ class PHISanitizer:
         self.db = PHIDatabase(db_path)
         self.generator = PHIGenerator()
         self.phi_replaced_count = 0
+        # (org name, identity) -> (fake org, DB row id), resolved once per run.
+        # Stored mappings never change, so entries stay valid for the whole run.
+        self._fake_org_cache = {}
+        # Same idea for people: patient hash -> (fake patient, patient id) and
+        # provider key -> fake provider.
+        self._patient_cache = {}
+        self._provider_cache = {}
     
     def sanitize_file(self, input_path: str, output_path: str) -> Dict:
         """
@@ -29,37 +122,79 @@ class PHISanitizer:
         """
         logger.info(f"Processing: {input_path}")
         
-        # Read file
-        with open(input_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-        
-        # Process HL7 v2.x message
-        message_type, sanitized_content, stats = self._sanitize_hl7(content)
-        
-        # Write sanitized file
         Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(sanitized_content)
+        message_type = None
+        phi_count = 0
+        # Every name found anywhere in the file, so free text in any message is
+        # scrubbed of names that only appear in structured fields of another
+        text_replacements = []
         
-        logger.info(f"Sanitized {stats['phi_count']} PHI elements")
+        # Two passes, one message in memory at a time: fields are sanitized and
+        # spooled to a temp file while the names are collected, then free text
+        # is scrubbed with the complete list on the way to the output
+        message_lengths = []
+        with open(input_path, 'r', encoding='utf-8', errors='ignore') as infile, \
+                tempfile.TemporaryFile('w+', encoding='utf-8', newline='') as spool:
+            for message in self._iter_messages(infile):
+                msg_type, structured_content, stats = self._sanitize_fields(
+                    message, text_replacements
+                )
+                if message_type is None:
+                    message_type = msg_type
+                phi_count += stats['phi_count']
+                spool.write(structured_content)
+                message_lengths.append(len(structured_content))
+            
+            spool.seek(0)
+            with open(output_path, 'w', encoding='utf-8') as outfile:
+                for index, length in enumerate(message_lengths):
+                    if index:
+                        outfile.write('\n')
+                    outfile.write(self._sanitize_free_text(spool.read(length), text_replacements))
+        
+        logger.info(f"Sanitized {phi_count} PHI elements")
         logger.info(f"Output: {output_path}")
         
         return {
             'message_type': message_type,
-            'phi_count': stats['phi_count'],
+            'phi_count': phi_count,
             'status': 'success'
         }
     
-    def _sanitize_hl7(self, content: str) -> Tuple[str, str, Dict]:
-        """Sanitize HL7 v2.x message"""
+    @staticmethod
+    def _iter_messages(lines):
+        """
+        Yield the messages of an HL7 file one at a time, each starting at its
+        MSH segment. Batch/file header lines before the first MSH stay with
+        the first message; an empty file yields a single empty message.
+        """
+        buffer = []
+        has_msh = False
+        yielded = False
+        for line in lines:
+            if line.startswith('MSH'):
+                if has_msh:
+                    yield ''.join(buffer)
+                    yielded = True
+                    buffer = []
+                has_msh = True
+            buffer.append(line)
+        if buffer or not yielded:
+            yield ''.join(buffer)
+    
+    def _sanitize_fields(self, content: str,
+                         text_replacements: List[Tuple[str, str]]) -> Tuple[str, str, Dict]:
+        """
+        Replace PHI in the structured fields of one message and return it
+        serialized. The (original, fake) name pairs it finds are appended to
+        text_replacements for _sanitize_free_text.
+        """
         parser = HL7Parser(content)
         message_type = parser.message_type or "UNKNOWN"
         
         # Extract PHI
         phi_data = parser.extract_phi()
         
-        # Track replacements for full-text search
-        text_replacements = []
         phi_count = 0
 
         # Process organizations first so MRN mapping can key on a stable org id.
@@ -75,19 +210,24 @@ class PHISanitizer:
             original_dob = patient.get('dob', '')
             
             patient_hash = self.db.hash_value(f"{original_name}|{original_dob}")
-            existing = self.db.get_patient_by_hash(patient_hash)
-            
-            if existing:
-                fake_patient = existing
-                patient_id = self.db.get_or_create_patient(
-                    original_name, original_dob, fake_patient
-                )
+            cached_patient = self._patient_cache.get(patient_hash)
+            if cached_patient is not None:
+                fake_patient, patient_id = cached_patient
             else:
-                fake_patient = self.generator.generate_patient(original_dob)
-                # Create in database
-                patient_id = self.db.get_or_create_patient(
-                    original_name, original_dob, fake_patient
-                )
+                existing = self.db.get_patient_by_hash(patient_hash)
+
+                if existing:
+                    fake_patient = existing
+                    patient_id = self.db.get_or_create_patient(
+                        original_name, original_dob, fake_patient
+                    )
+                else:
+                    fake_patient = self.generator.generate_patient(original_dob)
+                    # Create in database
+                    patient_id = self.db.get_or_create_patient(
+                        original_name, original_dob, fake_patient
+                    )
+                self._patient_cache[patient_hash] = (fake_patient, patient_id)
             
             # Replace in structured fields
             if patient.get('last_name'):
@@ -175,12 +315,15 @@ class PHISanitizer:
             if provider.get('last_name'):
                 # Check if we already have this provider in the database
                 provider_hash_key = f"{provider.get('last_name', '')}^{provider.get('first_name', '')}"
-                fake_provider = self.db.get_provider_by_hash(provider_hash_key)
-                
-                if not fake_provider:
-                    # Generate new fake provider and save to database
-                    fake_provider = self.generator.generate_provider()
-                    self.db.save_provider(provider_hash_key, fake_provider)
+                fake_provider = self._provider_cache.get(provider_hash_key)
+                if fake_provider is None:
+                    fake_provider = self.db.get_provider_by_hash(provider_hash_key)
+
+                    if not fake_provider:
+                        # Generate new fake provider and save to database
+                        fake_provider = self.generator.generate_provider()
+                        self.db.save_provider(provider_hash_key, fake_provider)
+                    self._provider_cache[provider_hash_key] = fake_provider
                 
                 # Track for text replacement in free text
                 text_replacements.append((provider['last_name'], fake_provider['last_name']))
@@ -251,13 +394,13 @@ class PHISanitizer:
                 phi_count += 1
         
         # Convert back to string
-        sanitized_content = parser.to_string()
-        
-        sanitized_content = self._apply_text_replacements(sanitized_content, text_replacements)
-        sanitized_content = self._apply_pattern_sanitization(sanitized_content)
-        
         stats = {'phi_count': phi_count}
-        return message_type, sanitized_content, stats
+        return message_type, parser.to_string(), stats
+    
+    def _sanitize_free_text(self, content: str, text_replacements: List[Tuple[str, str]]) -> str:
+        """Scrub names and other PHI patterns from a serialized message's free text"""
+        sanitized_content = self._apply_text_replacements(content, text_replacements)
+        return self._apply_pattern_sanitization(sanitized_content)
 
     def _sanitize_organizations(self, parser: HL7Parser,
                                 organizations: List[Dict]) -> Tuple[Optional[int], str, int]:
@@ -272,15 +415,10 @@ class PHISanitizer:
                 continue
 
             org_identity = org_name
-            fake_org = self.db.get_organization_by_hash(org_name, org_identity)
-            if not fake_org:
-                fake_org = self.generator.generate_organization()
-                self.db.save_organization(org_name, fake_org, original_identity=org_identity)
-                fake_org = self.db.get_organization_by_hash(org_name, org_identity)
+            fake_org, org_db_id = self._get_or_create_fake_org(org_name, org_identity)
             if not fake_org:
                 continue
 
-            org_db_id = self.db.get_organization_id_by_hash(org_name, org_identity)
             if primary_org_db_id is None and org_db_id:
                 primary_org_db_id = org_db_id
                 primary_org_prefix = fake_org.get('facility_id', '')
@@ -299,15 +437,7 @@ class PHISanitizer:
         if primary_org_db_id is None:
             fallback_name = "UNKNOWN_ORG"
             fallback_identity = "UNKNOWN_ORG"
-            fallback_org = self.db.get_organization_by_hash(fallback_name, fallback_identity)
-            if not fallback_org:
-                fallback_org = self.generator.generate_organization()
-                self.db.save_organization(
-                    fallback_name,
-                    fallback_org,
-                    original_identity=fallback_identity,
-                )
-            primary_org_db_id = self.db.get_organization_id_by_hash(
+            fallback_org, primary_org_db_id = self._get_or_create_fake_org(
                 fallback_name, fallback_identity
             )
             if fallback_org:
@@ -315,64 +445,132 @@ class PHISanitizer:
 
         return primary_org_db_id, primary_org_prefix, phi_count
 
+    def _get_or_create_fake_org(self, org_name: str,
+                                org_identity: str) -> Tuple[Optional[Dict], Optional[int]]:
+        """
+        Return (fake org, DB row id) for a source organization, creating the
+        mapping on first sight. Memoized per run; a new mapping takes its id
+        from save_organization instead of a second lookup.
+        """
+        cache_key = (org_name, org_identity)
+        cached = self._fake_org_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        fake_org = self.db.get_organization_by_hash(org_name, org_identity)
+        if fake_org:
+            org_db_id = self.db.get_organization_id_by_hash(org_name, org_identity)
+        else:
+            org_db_id = self.db.save_organization(
+                org_name, self.generator.generate_organization(), original_identity=org_identity
+            )
+            fake_org = self.db.get_organization_by_hash(org_name, org_identity)
+            if not fake_org:
+                return None, None
+
+        self._fake_org_cache[cache_key] = (fake_org, org_db_id)
+        return fake_org, org_db_id
+
     @staticmethod
     def _apply_text_replacements(content: str, text_replacements: List[Tuple[str, str]]) -> str:
-        """Apply case-insensitive literal text replacements."""
-        result = content
+        """
+        Apply case-insensitive literal text replacements in one pass.
+
+        All originals go into one alternation, longest first, so content is
+        scanned once instead of once per pair. When two pairs share an
+        original (ignoring case) the first one wins, as it did when the
+        pairs were applied in turn.
+        """
+        originals = {}
         for original, fake in text_replacements:
             if original and len(original) > 2:
-                result = re.sub(re.escape(original), fake, result, flags=re.IGNORECASE)
-        return result
+                originals.setdefault(original, fake)
+        if not originals:
+            return content
+        if content.isascii() and all(original.isascii() for original in originals):
+            return PHISanitizer._replace_ascii_literals(content, originals)
+
+        pattern = re.compile(
+            '|'.join(map(re.escape, sorted(originals, key=len, reverse=True))), re.IGNORECASE
+        )
+        resolved = {}
+
+        def replace_match(match):
+            text = match.group()
+            if text not in resolved:
+                # Equal under IGNORECASE is not the same as equal after
+                # casefold() or lower() (ß/SS, ſ/s), so ask re itself which
+                # original came first among those this text matches
+                resolved[text] = next(
+                    fake for original, fake in originals.items()
+                    if len(original) == len(text)
+                    and re.fullmatch(re.escape(original), text, re.IGNORECASE)
+                )
+            return resolved[text]
+
+        return pattern.sub(replace_match, content)
+
+    @staticmethod
+    def _replace_ascii_literals(content: str, originals: Dict[str, str]) -> str:
+        """
+        ASCII fast path for _apply_text_replacements: find the lowercased
+        originals in a lowercased copy with str.find, then splice the fakes
+        into the original. Taking the leftmost, then longest, non-overlapping
+        hit gives the same result as the longest-first IGNORECASE alternation.
+        """
+        mapping = {}
+        for original, fake in originals.items():
+            mapping.setdefault(original.lower(), fake)
+        lowered = content.lower()
+        spans = []
+        for key in mapping:
+            start = lowered.find(key)
+            while start != -1:
+                spans.append((start, -len(key), key))
+                start = lowered.find(key, start + 1)
+        if not spans:
+            return content
+
+        spans.sort()
+        pieces = []
+        pos = 0
+        for start, neg_length, key in spans:
+            if start < pos:
+                continue
+            pieces.append(content[pos:start])
+            pieces.append(mapping[key])
+            pos = start - neg_length
+        pieces.append(content[pos:])
+        return ''.join(pieces)
 
     def _apply_pattern_sanitization(self, content: str) -> str:
         """Apply regex and dictionary based PHI hardening for free text."""
-        sanitized_content = re.sub(
-            r'\b[A-Z][A-Z\s&\-\.]+\s+(SCHOOL|COLLEGE|UNIVERSITY|ACADEMY|INSTITUTE)\b',
-            'GENERIC EDUCATIONAL INSTITUTION',
-            content,
+        # Replacement text is ASCII, so one check up front covers every pass
+        (edu_re, street_re, sjsy_re, sjhs_re,
+         dr_name_re, ny_zip_re, area_code_re) = (
+            _FREE_TEXT_ASCII_RES if _is_plain_ascii(content) else _FREE_TEXT_RES
         )
+        sanitized_content = edu_re.sub('GENERIC EDUCATIONAL INSTITUTION', content)
 
         def replace_address(match):
             addr = self.generator.generate_address()
             return f"{addr['street']}"
 
-        sanitized_content = re.sub(
-            r'\b\d{1,5}\s+[A-Z][A-Za-z\s]+\s+(AVE|AVENUE|RD|ROAD|ST|STREET|BLVD|BOULEVARD|DR|DRIVE|LN|LANE|WAY|PKWY|PARKWAY)\b',
-            replace_address,
-            sanitized_content,
+        sanitized_content = street_re.sub(replace_address, sanitized_content)
+
+        sanitized_content = _NY_CITY_RE.sub(
+            lambda match: NY_TO_TX_CITIES[match.group()], sanitized_content
         )
 
-        ny_to_tx_cities = {
-            'SYRACUSE': 'HOUSTON',
-            'Syracuse': 'Houston',
-            'SAN ANTONIO': 'DALLAS',
-            'San Antonio': 'Dallas',
-            'ROCHESTER': 'AUSTIN',
-            'Rochester': 'Austin',
-            'ALBANY': 'FORT WORTH',
-            'Albany': 'Fort Worth',
-            'BUFFALO': 'EL PASO',
-            'Buffalo': 'El Paso',
-            'FULTON': 'ARLINGTON',
-            'Fulton': 'Arlington',
-            'DOBBS FERRY': 'PLANO',
-            'Dobbs Ferry': 'Plano',
-            'GREENWICH': 'CORPUS CHRISTI',
-            'Greenwich': 'Corpus Christi',
-            'BALDWINSVILLE': 'LAREDO',
-            'Baldwinsville': 'Laredo',
-            'LIVONIA': 'AMARILLO',
-            'Livonia': 'Amarillo',
-        }
-        for ny_city, tx_city in ny_to_tx_cities.items():
-            sanitized_content = sanitized_content.replace(ny_city, tx_city)
-
-        sanitized_content = re.sub(r'\bSJSY\b', 'TXMC', sanitized_content)
-        sanitized_content = re.sub(r'\bSJHS\b', 'TXHC', sanitized_content)
-        sanitized_content = re.sub(r'\bDr\.?\s+([A-Z][a-z]+)\b', 'Dr. Smith', sanitized_content)
-        sanitized_content = re.sub(r'\bNY\s+1\d{4}\b', 'TX 78205', sanitized_content)
-        sanitized_content = re.sub(r'\(315\)', '(210)', sanitized_content)
-        sanitized_content = re.sub(r'\b315\b', '210', sanitized_content)
+        sanitized_content = sjsy_re.sub('TXMC', sanitized_content)
+        sanitized_content = sjhs_re.sub('TXHC', sanitized_content)
+        sanitized_content = dr_name_re.sub('Dr. Smith', sanitized_content)
+        sanitized_content = ny_zip_re.sub('TX 78205', sanitized_content)
+        # One substring test skips both area-code passes for most messages;
+        # the parenthesized form is a literal, so str.replace covers it
+        if '315' in sanitized_content:
+            sanitized_content = sanitized_content.replace('(315)', '(210)')
+            sanitized_content = area_code_re.sub('210', sanitized_content)
 
         return sanitized_content
     
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+HL7 v2.x Batch File Validation Script
+Checks that a name found in one message of a multi-message file is scrubbed
+from the free text of every message, including the ones before it.
+"""
+
+import logging
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.sanitizer import PHISanitizer
+
+# Message 1 mentions a provider who only appears structurally in message 2
+BATCH = (
+    "MSH|^~\\&|EPIC|FAC1|X|Y|20230101||ORU^R01|1|P|2.5.1\n"
+    "PID|1||12345^^^MRN||Smith^John||19800101|M\n"
+    "OBR|1|||CBC\n"
+    "OBX|1|TX|||Discussed results with John and Karl Zimmerman today\n"
+    "MSH|^~\\&|EPIC|FAC1|X|Y|20230101||ORU^R01|2|P|2.5.1\n"
+    "PID|1||12345^^^MRN||Smith^John||19800101|M\n"
+    "OBR|1|||BMP||||||||||||222^Zimmerman^Karl\n"  # OBR-16 ordering provider
+    "OBX|1|TX|||Follow-up ordered\n"
+)
+
+LEAKED_NAMES = ["Zimmerman", "Karl", "Smith"]
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, "batch.hl7")
+        output_path = os.path.join(tmp, "out", "batch.hl7")
+        with open(input_path, "w", encoding="utf-8") as f:
+            f.write(BATCH)
+
+        sanitizer = PHISanitizer(os.path.join(tmp, "phi_mapping.db"))
+        try:
+            sanitizer.sanitize_file(input_path, output_path)
+        finally:
+            sanitizer.close()
+
+        with open(output_path, encoding="utf-8") as f:
+            output = f.read()
+
+    failures = 0
+    messages = output.count("MSH|")
+    status = messages == 2
+    failures += not status
+    print(f"  [{'PASS' if status else 'FAIL'}] both messages written ({messages} found)")
+    for name in LEAKED_NAMES:
+        status = name not in output
+        failures += not status
+        print(f"  [{'PASS' if status else 'FAIL'}] '{name}' scrubbed from every message")
+
+    if failures:
+        print(f"\n  ** {failures} CHECK(S) FAILED **\n")
+        print(output)
+        return 1
+    print("\n  ** ALL CHECKS PASSED **")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,8 @@ Maintains consistent mapping between real PHI and sanitized data
 import sqlite3
 import hashlib
 import logging
+from contextlib import contextmanager
+from functools import lru_cache
 from typing import Any, Dict, Optional
 
 try:
@@ -14,6 +16,8 @@ except ImportError:  # pragma: no cover - shared core may be used outside projec
 
 logger = logging.getLogger(__name__)
 _DEFAULT_DB_PATH = getattr(_project_config, "DB_FILE", None)
+# Stored in PRAGMA user_version; bump when _create_tables gains a migration
+_SCHEMA_VERSION = 2
 
 
 class PHIDatabase:
@@ -24,6 +28,13 @@ class PHIDatabase:
         if not self.db_path:
             raise ValueError("db_path is required when config.DB_FILE is unavailable")
         self.conn = None
+        self._batch_depth = 0
+        # (patient_id, org_id, original_mrn) -> fake MRN already resolved this run
+        self._mrn_cache = {}
+        # original hash -> row id; rows are never deleted, so ids stay valid
+        self._patient_ids = {}
+        self._org_ids = {}
+        self._provider_ids = {}
         self._ensure_database_exists()
     
     def _ensure_database_exists(self):
@@ -33,14 +44,30 @@ class PHIDatabase:
         if db_dir:
             os.makedirs(db_dir, exist_ok=True)
         
-        self.conn = sqlite3.connect(self.db_path)
+        # Wait on a busy database instead of failing when several processes write.
+        self.conn = sqlite3.connect(self.db_path, timeout=30)
         self.conn.row_factory = sqlite3.Row
+        # WAL lets readers run alongside the writer and, with synchronous=NORMAL,
+        # commits no longer fsync; only checkpoints do.
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        # 64 MiB page cache (negative = KiB) keeps the lookup indexes resident
+        self.conn.execute("PRAGMA cache_size=-65536")
+        # Read pages straight from a 256 MiB memory map instead of copying them
+        self.conn.execute("PRAGMA mmap_size=268435456")
         self._create_tables()
         logger.info(f"Database initialized: {self.db_path}")
     
     def _create_tables(self):
         """Create all database tables"""
         cursor = self.conn.cursor()
+        # A database already at the current version has every table, index
+        # and migration, so worker processes skip the DDL on open
+        cursor.execute("PRAGMA user_version")
+        if cursor.fetchone()[0] >= _SCHEMA_VERSION:
+            logger.debug("Database schema is current")
+            return
         
         # Patients table
         cursor.execute("""
@@ -115,6 +142,7 @@ class PHIDatabase:
 
         # Backward-compatible schema migration for existing databases.
         self._ensure_organization_schema(cursor)
+        cursor.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
         
         self.conn.commit()
         logger.debug("Database tables created/verified")
@@ -125,6 +153,36 @@ class PHIDatabase:
         columns = {row[1] for row in cursor.fetchall()}
         if "fake_org_id" not in columns:
             cursor.execute("ALTER TABLE organizations ADD COLUMN fake_org_id TEXT")
+        # Backfill ids once here (same value as _stable_org_id) so
+        # get_organization_by_hash never has to write
+        cursor.execute("""
+            UPDATE organizations
+            SET fake_org_id = 'ORG-' || upper(substr(original_org_hash, 1, 8))
+            WHERE fake_org_id IS NULL OR fake_org_id = ''
+        """)
+
+    def _commit(self):
+        """Commit now, unless inside batch() which commits once on exit"""
+        if not self._batch_depth:
+            self.conn.commit()
+
+    @contextmanager
+    def batch(self):
+        """
+        Defer commits until the block exits
+
+        Everything written inside the block is committed once at the end,
+        even if the block raised, like the per-call commits it replaces.
+        Intended for a single writer; parallel writers should keep per-call
+        commits so they don't hold the write lock for the whole block.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.conn.commit()
 
     @staticmethod
     def _stable_org_id(org_hash: str) -> str:
@@ -132,14 +190,17 @@ class PHIDatabase:
         return f"ORG-{org_hash[:8].upper()}"
     
     @staticmethod
+    @lru_cache(maxsize=4096)
     def hash_value(value: str) -> str:
-        """Create SHA256 hash of a value"""
+        """Create SHA256 hash of a value (memoized; the same keys recur across lookups)"""
         return hashlib.sha256(value.encode('utf-8')).hexdigest()
 
-    def _organization_hash(self, original_name: str, original_identity: str = "") -> str:
-        """Build the canonical hash key for organization mappings."""
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _organization_hash(original_name: str, original_identity: str = "") -> str:
+        """Build the canonical hash key for organization mappings (memoized per pair)."""
         source_identity = original_identity or original_name
-        return self.hash_value(f"{original_name}|{source_identity}")
+        return PHIDatabase.hash_value(f"{original_name}|{source_identity}")
 
     def _normalize_org_payload(self, org_data: Dict[str, Any], org_hash: str) -> Dict[str, Any]:
         """Normalize organization payloads from both v2 and v3 sanitizers."""
@@ -182,6 +243,9 @@ class PHIDatabase:
         """
         # Create hash from name + DOB for uniqueness
         hash_value = self.hash_value(f"{original_name}|{original_dob}")
+        cached = self._patient_ids.get(hash_value)
+        if cached is not None:
+            return cached
         
         cursor = self.conn.cursor()
         cursor.execute("SELECT id FROM patients WHERE original_name_hash = ?", (hash_value,))
@@ -189,18 +253,30 @@ class PHIDatabase:
         
         if result:
             logger.debug(f"Found existing patient: {hash_value[:8]}...")
+            self._patient_ids[hash_value] = result['id']
             return result['id']
         
         # Create new patient
-        cursor.execute("""
-            INSERT INTO patients (original_name_hash, fake_first_name, fake_last_name, 
-                                 fake_dob, fake_ssn)
-            VALUES (?, ?, ?, ?, ?)
-        """, (hash_value, fake_data['first_name'], fake_data['last_name'],
-              fake_data['dob'], fake_data['ssn']))
-        
-        self.conn.commit()
+        try:
+            cursor.execute("""
+                INSERT INTO patients (original_name_hash, fake_first_name, fake_last_name, 
+                                     fake_dob, fake_ssn)
+                VALUES (?, ?, ?, ?, ?)
+            """, (hash_value, fake_data['first_name'], fake_data['last_name'],
+                  fake_data['dob'], fake_data['ssn']))
+        except sqlite3.IntegrityError:
+            # Another worker created this patient between our lookup and insert.
+            # SQLite already undid the failed statement; _commit() just releases
+            # the write lock without discarding earlier writes in a batch().
+            self._commit()
+            cursor.execute("SELECT id FROM patients WHERE original_name_hash = ?", (hash_value,))
+            patient_id = cursor.fetchone()['id']
+            self._patient_ids[hash_value] = patient_id
+            return patient_id
+        
+        self._commit()
         patient_id = cursor.lastrowid
+        self._patient_ids[hash_value] = patient_id
         logger.info(f"Created new patient: {fake_data['first_name']} {fake_data['last_name']}")
         return patient_id
     
@@ -227,6 +303,9 @@ class PHIDatabase:
                                    fake_data: Dict[str, str]) -> int:
         """Get existing organization or create new one"""
         hash_value = self._organization_hash(original_org_name, original_identity)
+        cached = self._org_ids.get(hash_value)
+        if cached is not None:
+            return cached
         
         cursor = self.conn.cursor()
         cursor.execute("SELECT id FROM organizations WHERE original_org_hash = ?", (hash_value,))
@@ -234,29 +313,41 @@ class PHIDatabase:
         
         if result:
             logger.debug(f"Found existing organization: {hash_value[:8]}...")
+            self._org_ids[hash_value] = result['id']
             return result['id']
         
         normalized = self._normalize_org_payload(fake_data, hash_value)
 
         # Create new organization
-        cursor.execute("""
-            INSERT INTO organizations (original_org_hash, fake_org_name, fake_org_id, fake_address,
-                                      fake_city, fake_state, fake_zip, latitude, longitude)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            hash_value,
-            normalized['name'],
-            normalized['fake_org_id'],
-            normalized['street'],
-            normalized['city'],
-            normalized['state'],
-            normalized['zip'],
-            normalized['latitude'],
-            normalized['longitude'],
-        ))
-        
-        self.conn.commit()
+        try:
+            cursor.execute("""
+                INSERT INTO organizations (original_org_hash, fake_org_name, fake_org_id, fake_address,
+                                          fake_city, fake_state, fake_zip, latitude, longitude)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                hash_value,
+                normalized['name'],
+                normalized['fake_org_id'],
+                normalized['street'],
+                normalized['city'],
+                normalized['state'],
+                normalized['zip'],
+                normalized['latitude'],
+                normalized['longitude'],
+            ))
+        except sqlite3.IntegrityError:
+            # Another worker created this organization between our lookup and insert.
+            # SQLite already undid the failed statement; _commit() just releases
+            # the write lock without discarding earlier writes in a batch().
+            self._commit()
+            cursor.execute("SELECT id FROM organizations WHERE original_org_hash = ?", (hash_value,))
+            org_id = cursor.fetchone()['id']
+            self._org_ids[hash_value] = org_id
+            return org_id
+        
+        self._commit()
         org_id = cursor.lastrowid
+        self._org_ids[hash_value] = org_id
         logger.info(f"Created new organization: {normalized['name']}")
         return org_id
     
@@ -264,6 +355,9 @@ class PHIDatabase:
                                fake_data: Dict[str, str]) -> int:
         """Get existing provider or create new one"""
         hash_value = self.hash_value(f"{original_name}|{original_npi}")
+        cached = self._provider_ids.get(hash_value)
+        if cached is not None:
+            return cached
         
         cursor = self.conn.cursor()
         cursor.execute("SELECT id FROM providers WHERE original_provider_hash = ?", (hash_value,))
@@ -271,6 +365,7 @@ class PHIDatabase:
         
         if result:
             logger.debug(f"Found existing provider: {hash_value[:8]}...")
+            self._provider_ids[hash_value] = result['id']
             return result['id']
         
         # Create new provider
@@ -281,8 +376,9 @@ class PHIDatabase:
         """, (hash_value, fake_data['first_name'], fake_data['last_name'], 
               fake_data['npi']))
         
-        self.conn.commit()
+        self._commit()
         provider_id = cursor.lastrowid
+        self._provider_ids[hash_value] = provider_id
         logger.info(f"Created new provider: {fake_data['first_name']} {fake_data['last_name']}")
         return provider_id
     
@@ -298,8 +394,9 @@ class PHIDatabase:
         """, (hash_value, provider_data['first_name'], provider_data['last_name'], 
               provider_data.get('npi', '')))
         
-        self.conn.commit()
+        self._commit()
         provider_id = cursor.lastrowid
+        self._provider_ids[hash_value] = provider_id
         logger.info(f"Saved provider: {provider_data['first_name']} {provider_data['last_name']}")
         return provider_id
     
@@ -327,6 +424,21 @@ class PHIDatabase:
     def get_or_create_mrn(self, patient_id: int, org_id: int, 
                          original_mrn: str, fake_mrn: str) -> str:
         """Get existing MRN mapping or create new one"""
+        cache_key = (patient_id, org_id, original_mrn)
+        cached = self._mrn_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        mapped_mrn = self._resolve_mrn(patient_id, org_id, original_mrn, fake_mrn)
+        # A mapping that still embeds the original MRN is upgraded on every call,
+        # so only stable mappings may short-circuit the database.
+        if not (original_mrn and original_mrn in mapped_mrn):
+            self._mrn_cache[cache_key] = mapped_mrn
+        return mapped_mrn
+
+    def _resolve_mrn(self, patient_id: int, org_id: int,
+                     original_mrn: str, fake_mrn: str) -> str:
+        """Look up or insert the patient/org MRN mapping in the database"""
         mrn_hash = self.hash_value(original_mrn)
         
         cursor = self.conn.cursor()
@@ -345,7 +457,7 @@ class PHIDatabase:
                     SET original_mrn_hash = ?, fake_mrn = ?
                     WHERE patient_id = ? AND org_id = ?
                 """, (mrn_hash, fake_mrn, patient_id, org_id))
-                self.conn.commit()
+                self._commit()
                 logger.info(
                     f"Upgraded legacy MRN mapping for patient_id={patient_id}, org_id={org_id}"
                 )
@@ -355,12 +467,23 @@ class PHIDatabase:
             return existing_mrn
         
         # Create new mapping
-        cursor.execute("""
-            INSERT INTO patient_org_mrn (patient_id, org_id, original_mrn_hash, fake_mrn)
-            VALUES (?, ?, ?, ?)
-        """, (patient_id, org_id, mrn_hash, fake_mrn))
-        
-        self.conn.commit()
+        try:
+            cursor.execute("""
+                INSERT INTO patient_org_mrn (patient_id, org_id, original_mrn_hash, fake_mrn)
+                VALUES (?, ?, ?, ?)
+            """, (patient_id, org_id, mrn_hash, fake_mrn))
+        except sqlite3.IntegrityError:
+            # Another worker mapped this patient/org pair between our lookup and insert.
+            # SQLite already undid the failed statement; _commit() just releases
+            # the write lock without discarding earlier writes in a batch().
+            self._commit()
+            cursor.execute("""
+                SELECT fake_mrn FROM patient_org_mrn 
+                WHERE patient_id = ? AND org_id = ?
+            """, (patient_id, org_id))
+            return cursor.fetchone()['fake_mrn']
+        
+        self._commit()
         logger.info(f"Created new MRN mapping: {fake_mrn}")
         return fake_mrn
     
@@ -386,8 +509,9 @@ class PHIDatabase:
             normalized['longitude'],
         ))
         
-        self.conn.commit()
+        self._commit()
         org_id = cursor.lastrowid
+        self._org_ids[org_hash] = org_id
         logger.info(f"Saved organization: {normalized['name']} (ID: {org_id})")
         return org_id
     
@@ -397,23 +521,17 @@ class PHIDatabase:
         
         cursor = self.conn.cursor()
         cursor.execute("""
-            SELECT id, fake_org_name, fake_org_id, fake_address, fake_city, fake_state, fake_zip
+            SELECT fake_org_name, fake_org_id, fake_address, fake_city, fake_state, fake_zip
             FROM organizations WHERE original_org_hash = ?
         """, (org_hash,))
         result = cursor.fetchone()
         
         if result:
-            facility_id = result['fake_org_id'] or self._stable_org_id(org_hash)
-            if not result['fake_org_id']:
-                cursor.execute(
-                    "UPDATE organizations SET fake_org_id = ? WHERE id = ?",
-                    (facility_id, result['id'])
-                )
-                self.conn.commit()
-            
             return {
                 'name': result['fake_org_name'],
-                'facility_id': facility_id,
+                # Migrated rows always carry an id; the fallback only covers
+                # rows an older process writes while this one runs
+                'facility_id': result['fake_org_id'] or self._stable_org_id(org_hash),
                 'address': {
                     'street': result['fake_address'],
                     'city': result['fake_city'],
@@ -427,29 +545,28 @@ class PHIDatabase:
     def get_organization_id_by_hash(self, original_name: str, original_identity: str = "") -> Optional[int]:
         """Get database organization row id for a source org key."""
         org_hash = self._organization_hash(original_name, original_identity)
+        cached = self._org_ids.get(org_hash)
+        if cached is not None:
+            return cached
         cursor = self.conn.cursor()
         cursor.execute("SELECT id FROM organizations WHERE original_org_hash = ?", (org_hash,))
         result = cursor.fetchone()
-        return result['id'] if result else None
+        if not result:
+            return None
+        self._org_ids[org_hash] = result['id']
+        return result['id']
     
     def get_stats(self) -> Dict[str, int]:
         """Get database statistics"""
         cursor = self.conn.cursor()
-        
-        stats = {}
-        cursor.execute("SELECT COUNT(*) as count FROM patients")
-        stats['patients'] = cursor.fetchone()['count']
-        
-        cursor.execute("SELECT COUNT(*) as count FROM organizations")
-        stats['organizations'] = cursor.fetchone()['count']
-        
-        cursor.execute("SELECT COUNT(*) as count FROM providers")
-        stats['providers'] = cursor.fetchone()['count']
-        
-        cursor.execute("SELECT COUNT(*) as count FROM patient_org_mrn")
-        stats['mrn_mappings'] = cursor.fetchone()['count']
-        
-        return stats
+        # One statement: a single round-trip and one consistent snapshot
+        cursor.execute("""
+            SELECT (SELECT COUNT(*) FROM patients) AS patients,
+                   (SELECT COUNT(*) FROM organizations) AS organizations,
+                   (SELECT COUNT(*) FROM providers) AS providers,
+                   (SELECT COUNT(*) FROM patient_org_mrn) AS mrn_mappings
+        """)
+        return dict(cursor.fetchone())
     
     def close(self):
         """Close database connection"""